@@ -0,0 +1,78 @@
+"""
+Compare the detector backends on the sample images.
+
+Every backend goes through the same load -> warmup -> infer(batch) calls
+from detector_backend.py, so the numbers are directly comparable: load
+time, first (warm-up) run, and mean latency per image for single images
+and for one batch of all sample images. Backends whose framework or model
+file is missing are reported and skipped.
+
+The backend's own report() follows, for "yolo-stream" it splits the time
+into preprocess / inference / postprocess and the overhead outside the
+forward pass. Compare "yolo" (model.predict per frame) against it.
+
+Run with: python bench_backends.py [backend ...]
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR
+from detector_backend import BACKENDS, create_backend
+
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+RUNS = 10
+
+
+def load_images(order):
+    """Sample images in the channel order the backend wants (cv2.imread gives BGR)"""
+    images = [cv2.imread(path) for path in IMAGES]
+    if order != BGR:
+        images = [np.ascontiguousarray(image[..., ::-1]) for image in images]
+    return images
+
+
+def bench(name, runs):
+    backend = create_backend(name)
+    started = time.perf_counter()
+    try:
+        backend.load()
+    except Exception as e:
+        print(f"{name:<6} skipped: {e}")
+        return
+    load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    backend.warmup()
+    warmup_time = time.perf_counter() - started
+
+    images = load_images(backend.order)
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        for image in images:
+            detections = backend.detect(image)
+    single = (time.perf_counter() - started) / (runs * len(images))
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        detections = backend.infer(images)
+    batched = (time.perf_counter() - started) / (runs * len(images))
+
+    counts = [len(detections.for_image(i)) for i in range(len(images))]
+    print(f"{name:<6} load {load_time:6.2f} s  warm-up {warmup_time * 1000:7.1f} ms  "
+          f"single {single * 1000:7.2f} ms/img  batch {batched * 1000:7.2f} ms/img  detections {counts}")
+    print(f"       {backend.report()}")
+    backend.close()
+
+
+def run(names):
+    for name in names:
+        bench(name, RUNS)
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:] or list(BACKENDS))
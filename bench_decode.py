@@ -0,0 +1,81 @@
+"""
+Benchmark the per-frame cost of turning a decoded 960x720 Tello frame into RGB.
+
+    old: frame.to_ndarray(format="bgr24") followed by cv2.cvtColor(BGR2RGB)
+    new: FrameDecoder("rgb24").convert(frame), releasing each image
+
+Frames are synthesised as yuv420p, which is what the H.264 decoder hands out,
+so no drone is needed. Memory is reported as resident set size growth over the
+timed loop, read from /proc/self/statm, since tracemalloc cannot see the frames
+FFmpeg and OpenCV allocate. Both paths free those right away, so this shows
+leaks or buffers piling up, not per-frame allocation churn.
+Run with: python bench_decode.py [frames]
+"""
+
+import sys
+import os
+import time
+
+import av
+import cv2
+import numpy as np
+
+from video_decode import FrameDecoder
+
+
+def make_frames(count, width=960, height=720):
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        rgb = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        frames.append(av.VideoFrame.from_ndarray(rgb, format="rgb24").reformat(format="yuv420p"))
+    return frames
+
+
+def old_path(frame):
+    return cv2.cvtColor(frame.to_ndarray(format="bgr24"), cv2.COLOR_BGR2RGB)
+
+
+def rss():
+    """Resident set size of this process in bytes"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(name, convert, frames, repeat):
+    # Warm up caches and the swscale context
+    for frame in frames:
+        convert(frame)
+
+    rss_start = rss()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            convert(frame)
+    count = repeat * len(frames)
+    cpu = (time.process_time() - cpu_start) / count
+    wall = (time.perf_counter() - wall_start) / count
+    growth = rss() - rss_start
+
+    print(f"{name}: {cpu * 1000:.2f} ms CPU / {wall * 1000:.2f} ms wall per frame, "
+          f"RSS {growth / 1024:+.0f} KiB over {count} frames")
+
+
+def run(count=200):
+    frames = make_frames(10)
+    repeat = max(1, count // len(frames))
+    cv2.setNumThreads(1)
+
+    measure("bgr24 + cvtColor", old_path, frames, repeat)
+    decoder = FrameDecoder("rgb24")
+
+    def new_path(frame):
+        decoder.release(decoder.convert(frame))
+
+    measure("FrameDecoder rgb24", new_path, frames, repeat)
+    print(f"FrameDecoder pool: {decoder.pool}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,144 @@
+"""
+Compare the DECODER_MODES in video_decode.py on a recorded Tello stream.
+
+For every mode this reports:
+
+    throughput   decoded frames per second when packets are fed as fast as possible
+    cpu          CPU time per frame (all threads)
+    delay        how many packets the demuxer and decoder hold back before a frame comes out
+    latency      time from writing a packet into the stream to getting its frame,
+                 with packets fed at the stream rate like the live UDP feed
+    lost         frames that never come out of the decoder
+
+Packets are written into a pipe that open_stream() reads like the UDP socket,
+so each mode's container options are part of the measurement, not just its
+codec settings.
+
+Run with: python bench_decoder_modes.py [recording.h264]
+
+Without a recording, a 960x720 30 fps H.264 clip without B-frames (like the
+Tello stream) is encoded into a temporary file first.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import av
+import numpy as np
+
+from video_decode import DECODER_MODES, decode_frames, open_stream
+
+
+def make_recording(path, frames=300, width=960, height=720, fps=30):
+    container = av.open(path, "w", format="h264")
+    stream = container.add_stream("libx264", rate=fps)
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = "yuv420p"
+    stream.options = {"preset": "veryfast", "tune": "zerolatency", "profile": "main", "g": str(fps)}
+
+    # A moving gradient with some noise so the encoder has real work to do
+    rng = np.random.default_rng(0)
+    x = np.arange(width, dtype=np.uint16)
+    y = np.arange(height, dtype=np.uint16)[:, None]
+    for i in range(frames):
+        rgb = np.empty((height, width, 3), np.uint8)
+        rgb[..., 0] = (x + i * 4) % 256
+        rgb[..., 1] = (y + i * 2) % 256
+        rgb[..., 2] = rng.integers(0, 64, (height, width), dtype=np.uint8)
+        for packet in stream.encode(av.VideoFrame.from_ndarray(rgb, format="rgb24")):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+
+
+def read_packets(path):
+    container = av.open(path)
+    packets = [bytes(packet) for packet in container.demux(video=0) if packet.size]
+    container.close()
+    return packets
+
+
+def feed(pipe, packets, rate, sent):
+    """Write the packets into the pipe, at `rate` packets per second if given, recording when each was sent"""
+    with os.fdopen(pipe, "wb", buffering=0) as writer:
+        start = time.perf_counter()
+        for i, data in enumerate(packets):
+            if rate:
+                # Wait for the packet's arrival time on a live stream
+                due = start + i / rate
+                while time.perf_counter() < due:
+                    time.sleep(0.0005)
+            sent.append(time.perf_counter())
+            writer.write(data)
+
+
+def decode(mode, packets, rate=None):
+    """
+
+    Stream the packets through a pipe into a container opened with open_stream() for `mode`
+    and decode it with decode_frames(), so the mode's container options (the demuxer's
+    buffering) are measured along with its decoder settings. Returns per-frame timings.
+
+    """
+    read_end, write_end = os.pipe()
+    sent = []
+    feeder = threading.Thread(target=feed, args=(write_end, packets, rate, sent), daemon=True)
+
+    received = []  # (time, packets sent so far) for every decoded frame
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    feeder.start()
+
+    # Unbuffered, so each read returns what is in the pipe instead of waiting for a full block
+    with os.fdopen(read_end, "rb", buffering=0) as pipe:
+        container = open_stream(pipe, mode)
+        for _ in decode_frames(container):
+            received.append((time.perf_counter(), len(sent)))
+        container.close()
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    feeder.join()
+
+    # Frames that never come out are the first ones (dropped while probing or waiting for
+    # the keyframe), so frame i belongs to packet i + lost
+    frames = len(received)
+    lost = len(packets) - frames
+    latencies = [at - sent[i + lost] for i, (at, _) in enumerate(received)]
+    delays = [count - 1 - (i + lost) for i, (_, count) in enumerate(received)]
+    return frames, wall, cpu, latencies, delays
+
+
+def run(path=None):
+    packets = None
+    temp_dir = None
+    if path is None:
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, "tello.h264")
+        make_recording(path)
+        print(f"No recording given, using a synthetic clip: {path}")
+
+    packets = read_packets(path)
+    print(f"{len(packets)} packets")
+    print(f"{'mode':<10} {'throughput':>12} {'cpu/frame':>10} {'delay':>7} {'latency':>9} {'p95':>9} {'lost':>7}")
+
+    for mode in DECODER_MODES:
+        frames, wall, cpu, _, _ = decode(mode, packets)
+        _, _, _, latencies, delays = decode(mode, packets, rate=30)
+        latencies = np.array(latencies) * 1000
+        print(f"{mode:<10} {frames / wall:>8.0f} fps {cpu / frames * 1000:>7.2f} ms "
+              f"{max(delays) if delays else 0:>4} fr {np.median(latencies):>6.2f} ms "
+              f"{np.percentile(latencies, 95):>6.2f} ms {len(packets) - frames:>4} fr")
+
+    if temp_dir:
+        os.remove(path)
+        os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else None)
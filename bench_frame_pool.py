@@ -0,0 +1,102 @@
+"""
+Check that the pooled per-frame OpenCV loop has flat memory use.
+
+Runs the same resize -> cvtColor -> detector blob -> overlay copy sequence as
+with-model-cv-try.py / with-joystick.py on synthetic 960x720 frames, once with
+fresh arrays per frame and once with FramePool buffers and `dst=` outputs.
+tracemalloc records how much numpy memory is allocated per frame; that
+includes the arrays OpenCV returns to Python, but not OpenCV's internal
+scratch buffers, so the steady-state check uses the resident set size from
+/proc/self/statm instead: RSS after 10k pooled frames against right after
+warm-up.
+
+Run with: python bench_frame_pool.py [frames]
+Exits with status 1 if the pooled loop's memory grows in steady state.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_pool import FramePool, blob_from_image
+
+# Allowed RSS growth after warm-up, the allocators keep a few pages around
+MAX_GROWTH = 1024 * 1024
+
+
+def rss():
+    """Resident set size of this process in bytes"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def naive_step(frame):
+    frame_resized = cv2.resize(frame, (720, 480))
+    cv2image = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
+    blob = cv2.dnn.blobFromImage(frame_resized, size=(300, 300), swapRB=True, crop=False)
+    overlay = cv2image.copy()
+    cv2.rectangle(overlay, (10, 10), (100, 100), (0, 255, 0), 2)
+    return blob
+
+
+def pooled_step(frame, pool):
+    frame_resized = cv2.resize(frame, (720, 480), dst=pool.borrow((480, 720, 3)))
+    cv2image = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB, dst=pool.borrow((480, 720, 3)))
+    with pool.buffer((300, 300, 3)) as resized, pool.buffer((1, 3, 300, 300), np.float32) as blob:
+        cv2.resize(frame_resized, (300, 300), dst=resized)
+        blob_from_image(resized, blob, swap_rb=True)
+    overlay = pool.copy(cv2image)
+    cv2.rectangle(overlay, (10, 10), (100, 100), (0, 255, 0), 2)
+    for buffer in (frame_resized, cv2image, overlay):
+        pool.release(buffer)
+
+
+def peak_per_frame(step, frame, count=20):
+    """Largest amount of new numpy memory a single step allocates, after a few warm-up steps"""
+    tracemalloc.start()
+    worst = 0
+    for i in range(count):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        step(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        if i >= 3:
+            worst = max(worst, peak - before)
+    tracemalloc.stop()
+    return worst
+
+
+def run(frames=10000):
+    frame = np.random.default_rng(0).integers(0, 255, (720, 960, 3), dtype=np.uint8)
+    pool = FramePool()
+
+    naive_peak = peak_per_frame(naive_step, frame)
+    pooled_peak = peak_per_frame(lambda f: pooled_step(f, pool), frame)
+    print(f"naive:  {naive_peak / 1024:8.0f} KiB of numpy arrays allocated per frame")
+    print(f"pooled: {pooled_peak / 1024:8.0f} KiB of numpy arrays allocated per frame")
+
+    # Steady state: RSS after warm-up vs after `frames` more frames, OpenCV's own buffers included
+    for _ in range(100):
+        pooled_step(frame, pool)
+    baseline = rss()
+
+    started = time.perf_counter()
+    for _ in range(frames):
+        pooled_step(frame, pool)
+    elapsed = time.perf_counter() - started
+
+    growth = rss() - baseline
+    print(f"pooled: {frames} frames in {elapsed:.1f} s, RSS growth {growth / 1024:.1f} KiB, pool: {pool}")
+    if growth > MAX_GROWTH:
+        print("FAIL: memory grows in steady state")
+        return 1
+    print("OK: steady-state memory is flat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
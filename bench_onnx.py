@@ -0,0 +1,87 @@
+"""
+Compare the ONNX Runtime backend (FP32 and INT8) with the PyTorch YOLO path.
+
+All models see the same sample images. For each one this prints:
+
+    latency      mean time for one image through infer()
+    throughput   images per second when the images are sent as one batch
+    accuracy     agreement with the PyTorch detections, which serve as the
+                 reference: recall and precision at IoU >= 0.5 with the same
+                 class, and the mean IoU of the matched boxes
+
+Create the models first with: python export_onnx.py best.pt --int8
+Run with: python bench_onnx.py [best.pt] [best.onnx] [best-int8.onnx]
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR
+from detections import agreement
+from detector_backend import create_backend
+
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+RUNS = 20
+
+
+def load_images(order):
+    images = [cv2.imread(path) for path in IMAGES]
+    if order != BGR:
+        images = [np.ascontiguousarray(image[..., ::-1]) for image in images]
+    return images
+
+
+def measure(backend):
+    """(latency s, images/s, Detections of the batch) for a loaded backend"""
+    backend.warmup()
+    images = load_images(backend.order)
+
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        for image in images:
+            backend.detect(image)
+    latency = (time.perf_counter() - started) / (RUNS * len(images))
+
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        detections = backend.infer(images)
+    throughput = RUNS * len(images) / (time.perf_counter() - started)
+    return latency, throughput, detections
+
+
+def run(model_path="best.pt", onnx_path="best.onnx", int8_path="best-int8.onnx"):
+    candidates = [
+        ("pytorch", "yolo-stream", model_path),
+        ("onnx fp32", "onnx", onnx_path),
+        ("onnx int8", "onnx", int8_path),
+    ]
+
+    reference = None
+    for label, name, path in candidates:
+        backend = create_backend(name, model_path=path)
+        try:
+            started = time.perf_counter()
+            backend.load()
+            load_time = time.perf_counter() - started
+        except Exception as e:
+            print(f"{label:<10} skipped: {e}")
+            continue
+
+        latency, throughput, detections = measure(backend)
+        line = (f"{label:<10} load {load_time:6.2f} s  latency {latency * 1000:7.2f} ms  "
+                f"throughput {throughput:6.1f} img/s  {len(detections)} detections")
+        if reference is None:
+            reference = detections
+            line += "  (reference)"
+        else:
+            recall, precision, iou = agreement(reference, detections)
+            line += f"  recall {recall:.2f}  precision {precision:.2f}  IoU {iou:.3f}"
+        print(line)
+        backend.close()
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:4])
@@ -0,0 +1,93 @@
+"""
+Sequential vs pipelined inference on a simulated Tello feed.
+
+Every frame goes through the same three steps as in with-model.py: make
+the display and 300x300 detector images (the decoder's job), run the
+detector, and draw the boxes onto a copy of the display frame. The
+sequential loop does them one after the other, backend.pipeline() overlaps
+them across consecutive frames. Throughput (frames per second) and the
+latency from a frame entering the loop to its boxes being drawn are
+reported for both. Frames come as fast as possible, or at `fps` like the
+Tello stream; the pipeline skips frames that went stale while the model was
+busy, so its throughput counts only the frames it delivered.
+
+Run with: python bench_pipeline.py [backend] [frames] [fps]
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR
+from detector_backend import create_backend
+from video_pipeline import draw_boxes
+
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+DISPLAY_SIZE = (960, 720)  # The Tello's stream size
+
+
+def source(images, count, input_size, fps=None):
+    """(entry time, display frame) and the detector input, like the decoder produces them"""
+    width, height = input_size or DISPLAY_SIZE
+    start = time.perf_counter()
+    for i in range(count):
+        if fps:
+            # Wait for the frame's arrival time on a live stream
+            due = start + i / fps
+            while time.perf_counter() < due:
+                time.sleep(0.0005)
+        started = time.perf_counter()
+        display = cv2.resize(images[i % len(images)], DISPLAY_SIZE)
+        yield (started, display), cv2.resize(display, (width, height))
+
+
+def draw(display, detections):
+    frame = display.copy()
+    h, w, _ = frame.shape
+    return draw_boxes(frame, detections.pixels(w, h))
+
+
+def sequential(backend, frames):
+    latencies = []
+    for (started, display), image in frames:
+        draw(display, backend.detect(image))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def pipelined(backend, frames):
+    latencies = []
+    for (started, display), detections in backend.pipeline(frames):
+        draw(display, detections)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run(name="tf", count=100, fps=None):
+    backend = create_backend(name)
+    try:
+        backend.warmup()
+    except Exception as e:
+        print(f"{name} skipped: {e}")
+        return
+
+    images = [cv2.imread(path) for path in IMAGES]
+    if backend.order != BGR:
+        images = [np.ascontiguousarray(image[..., ::-1]) for image in images]
+
+    for label, loop in (("sequential", sequential), ("pipelined", pipelined)):
+        started = time.perf_counter()
+        latencies = loop(backend, source(images, count, backend.input_size, fps))
+        elapsed = time.perf_counter() - started
+        print(f"{name} {label:<10}  {len(latencies) / elapsed:6.1f} fps, latency {np.mean(latencies) * 1000:.1f} ms mean, "
+              f"{np.percentile(latencies, 95) * 1000:.1f} ms p95, {count - len(latencies)} frames skipped")
+
+    print(backend.report())
+    backend.close()
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "tf", int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+        float(sys.argv[3]) if len(sys.argv) > 3 else None)
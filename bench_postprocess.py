@@ -0,0 +1,75 @@
+"""
+Per-frame cost of the detection post-processing.
+
+Feeds synthetic SSD output (100 rows per frame, like detection_boxes /
+detection_scores / detection_classes) through the old per-detection Python
+loop from detect_objects / detect_faces and through PostProcessor, which
+does the same thresholding and pixel scaling plus the animal allowlist and
+NMS with array operations only.
+
+Run with: python bench_postprocess.py [frames]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from detections import COCO_ANIMALS, Detections, PostProcessor
+
+WIDTH, HEIGHT = 960, 720
+
+
+def synthetic_output(rng):
+    """One frame of SSD output: (1, 100, 4) yx boxes, (1, 100) scores and classes, (1,) count"""
+    top_left = rng.random((100, 2)) * 0.8
+    boxes = np.concatenate([top_left, top_left + rng.random((100, 2)) * 0.2], axis=1).astype(np.float32)
+    scores = np.sort(rng.random(100).astype(np.float32) ** 3)[::-1]
+    classes = rng.integers(1, 91, 100).astype(np.float32)
+    return boxes[np.newaxis], scores[np.newaxis].copy(), classes[np.newaxis], np.array([100.0], np.float32)
+
+
+def loop_step(output):
+    boxes, scores, classes, num_detections = output
+    h, w = HEIGHT, WIDTH
+    found = []
+    for i in range(int(num_detections[0])):
+        if scores[0][i] > 0.5:
+            box = boxes[0][i]
+            (ymin, xmin, ymax, xmax) = (box[0] * h, box[1] * w, box[2] * h, box[3] * w)
+            found.append((int(xmin), int(ymin), int(xmax), int(ymax)))
+    return found
+
+
+def vector_step(output, postprocess):
+    boxes, scores, classes, num_detections = output
+    detections = Detections(boxes[0][:, [1, 0, 3, 2]], scores[0], classes[0])
+    return postprocess(detections).pixels(WIDTH, HEIGHT)
+
+
+def timed(step, outputs):
+    started = time.perf_counter()
+    for output in outputs:
+        step(output)
+    return (time.perf_counter() - started) / len(outputs)
+
+
+def run(frames):
+    rng = np.random.default_rng(0)
+    outputs = [synthetic_output(rng) for _ in range(frames)]
+
+    threshold = PostProcessor(0.5)
+    animals = PostProcessor(0.5, classes=COCO_ANIMALS, class_thresholds={22: 0.6}, nms_iou=0.5)
+    results = [
+        ("python loop (threshold)", timed(loop_step, outputs)),
+        ("vectorised (threshold)", timed(lambda o: vector_step(o, threshold), outputs)),
+        ("vectorised + allowlist + NMS", timed(lambda o: vector_step(o, animals), outputs)),
+    ]
+
+    print(f"{frames} frames, 100 raw detections each")
+    for name, seconds in results:
+        print(f"  {name:<30} {seconds * 1e6:8.1f} us/frame")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,79 @@
+"""
+Compare the TFLite backend with the TF1 Session path for the SSD MobileNet graph.
+
+Every configuration sees the same sample images one at a time (batch size 1,
+as on the drone). For each this prints the load time, which includes
+importing the runtime the first time, the mean latency per image and how
+well its detections agree with the Session's: recall and precision at
+IoU >= 0.5 with the same class, and the mean IoU of the matches.
+
+Configurations are the FP32 / FP16 / INT8 models from export_tflite.py,
+with 1, 2 and 4 threads, with and without the XNNPACK delegate. Missing
+models or runtimes are reported and skipped.
+
+Run with: python bench_tflite.py [frozen_inference_graph.pb]
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detections import agreement
+from detector_backend import create_backend
+
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+RUNS = 20
+MODELS = ["ssd_mobilenet_v1.tflite", "ssd_mobilenet_v1-fp16.tflite", "ssd_mobilenet_v1-int8.tflite"]
+THREADS = [1, 2, 4]
+
+
+def measure(backend, images):
+    """(load s, latency s, Detections of all images) for one backend"""
+    started = time.perf_counter()
+    backend.load()
+    load_time = time.perf_counter() - started
+    backend.warmup()
+
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        for image in images:
+            backend.detect(image)
+    latency = (time.perf_counter() - started) / (RUNS * len(images))
+    return load_time, latency, backend.infer(images)
+
+
+def run(graph_path="frozen_inference_graph.pb"):
+    # Both paths take RGB 300x300, the backends resize
+    images = [np.ascontiguousarray(cv2.imread(path)[..., ::-1]) for path in IMAGES]
+
+    configurations = [("session", create_backend("tf", model_path=graph_path))]
+    for model in MODELS:
+        for threads in THREADS:
+            for xnnpack in (True, False):
+                label = f"{model} t{threads}{'' if xnnpack else ' no-xnnpack'}"
+                configurations.append((label, create_backend("tflite", model_path=model, threads=threads,
+                                                             xnnpack=xnnpack)))
+
+    reference = None
+    for label, backend in configurations:
+        try:
+            load_time, latency, detections = measure(backend, images)
+        except Exception as e:
+            print(f"{label:<45} skipped: {e}")
+            continue
+
+        line = f"{label:<45} load {load_time:6.2f} s  latency {latency * 1000:7.2f} ms  {len(detections)} detections"
+        if reference is None:
+            reference = detections
+            line += "  (reference)"
+        else:
+            recall, precision, iou = agreement(reference, detections)
+            line += f"  recall {recall:.2f}  precision {precision:.2f}  IoU {iou:.3f}"
+        print(line)
+        backend.close()
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:2])
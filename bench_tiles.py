@@ -0,0 +1,69 @@
+"""
+Cost and yield of tiled inference for different tile sizes.
+
+Every sample image is upscaled to the Tello's 960x720 (so the animals are
+as small as at survey altitude relative to the frame) and run through the
+backend once as a whole frame and then through TiledDetector with each
+tile size. Reported per configuration: tiles per frame, milliseconds per
+frame and per tile, frames per second and the number of animals found.
+
+Run with: python bench_tiles.py [backend] [tile ...]
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR
+from detector_backend import create_backend
+from tiled_inference import TiledDetector
+
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+FRAME_SIZE = (960, 720)
+RUNS = 5
+
+
+def load_frames(order):
+    frames = [cv2.resize(cv2.imread(path), FRAME_SIZE) for path in IMAGES]
+    if order != BGR:
+        frames = [np.ascontiguousarray(frame[..., ::-1]) for frame in frames]
+    return frames
+
+
+def measure(detector, frames):
+    """(ms per frame, animals found per frame)"""
+    found = sum(len(detector.detect(frame)) for frame in frames)
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        for frame in frames:
+            detector.detect(frame)
+    return (time.perf_counter() - started) / (RUNS * len(frames)), found / len(frames)
+
+
+def run(name="tflite", tiles=(640, 480, 320)):
+    backend = create_backend(name)
+    try:
+        backend.warmup()
+    except Exception as e:
+        print(f"{name} skipped: {e}")
+        return
+    frames = load_frames(backend.order)
+
+    per_frame, found = measure(backend, frames)
+    print(f"{name} whole frame       1 tile     {per_frame * 1000:7.1f} ms/frame  {1 / per_frame:6.1f} fps  "
+          f"{found:.1f} animals")
+
+    for tile in tiles:
+        detector = TiledDetector(backend, tile=tile)
+        per_frame, found = measure(detector, frames)
+        count = detector.tiles / detector.frames
+        print(f"{name} tile {tile:<4} px     {count:3.0f} tiles   {per_frame * 1000:7.1f} ms/frame  "
+              f"{1 / per_frame:6.1f} fps  {found:.1f} animals  ({per_frame / count * 1000:.1f} ms/tile)")
+
+    backend.close()
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "tflite", [int(tile) for tile in sys.argv[2:]] or (640, 480, 320))
@@ -0,0 +1,87 @@
+"""
+Two-stage detection: a cheap proposal model first, best.pt only where it fires.
+
+On long survey legs most frames have no animal in them, yet every frame
+paid for a full YOLO forward pass. CascadeDetector runs a light first
+stage (the SSD MobileNet graph through cv2.dnn or TFLite, with a low
+threshold) on every frame, and only frames - or, in "regions" mode, only
+padded windows around the proposals - that it finds something in go to
+the full animal model. Empty frames cost just the first stage.
+"""
+
+import time
+
+from detections import Detections
+from roi_inference import RoiDetector
+
+
+class CascadeDetector:
+    """
+
+    Proposal stage, then the full detector on what it proposes.
+
+           detect(image)   image in `order` -> Detections
+           report()        proposal hit rate, confirmation rate and cost per frame
+
+    mode="frame" sends the whole frame to `detector` when there is any
+    proposal; it only needs detect(), so a DetectorProcess works. mode="regions"
+    sends a batch of crops around the proposals through `detector.infer()`,
+    which needs a backend. Images come in `order`, by default the detector's
+    (give it for a DetectorProcess); the proposal backend gets them in its own.
+
+    """
+
+    def __init__(self, proposal, detector, mode="frame", padding=0.5, order=None):
+        if mode not in ("frame", "regions"):
+            raise ValueError(f"Unknown cascade mode: {mode}")
+        self.proposal = proposal
+        self.detector = detector
+        self.mode = mode
+        self.order = order or detector.order
+        self.regions = RoiDetector(detector, padding=padding) if mode == "regions" else None
+
+        self.last_time = 0.0
+        self.frames = 0
+        self.proposed = 0   # Frames the first stage found something in
+        self.confirmed = 0  # ... and the full detector too
+        self.proposal_time = 0.0
+        self.detector_time = 0.0
+
+    @property
+    def names(self):
+        return self.detector.names
+
+    def detect(self, image):
+        started = time.perf_counter()
+        self.frames += 1
+
+        # Both stages see the same pixels, only reversed when their channel orders differ
+        proposal_image = image if self.proposal.order == self.order else image[..., ::-1]
+        proposals = self.proposal.detect(proposal_image)
+        proposed = time.perf_counter()
+        self.proposal_time += proposed - started
+
+        if not len(proposals):
+            detections = Detections()
+        else:
+            self.proposed += 1
+            if self.regions is None:
+                detections = self.detector.detect(image)
+            else:
+                height, width = image.shape[:2]
+                detections = self.regions.detect_windows(image, self.regions.windows(proposals.boxes, width, height))
+            self.confirmed += bool(len(detections))
+            self.detector_time += time.perf_counter() - proposed
+
+        self.last_time = time.perf_counter() - started
+        return detections
+
+    def report(self):
+        frames = max(self.frames, 1)
+        hit_rate = self.proposed / frames
+        confirmed = self.confirmed / max(self.proposed, 1)
+        cost = (self.proposal_time + self.detector_time) / frames
+        return (f"Cascade ({self.mode}): {self.proposed} of {self.frames} frames proposed ({hit_rate:.0%}), "
+                f"{confirmed:.0%} of those confirmed, {cost * 1000:.1f} ms per frame "
+                f"(proposal {self.proposal_time / frames * 1000:.1f} ms, "
+                f"detector {self.detector_time / max(self.proposed, 1) * 1000:.1f} ms when run)")
@@ -0,0 +1,100 @@
+"""
+Frame container that knows its channel order.
+
+The scripts used to guess whether a frame was BGR or RGB and converted it
+"just in case", sometimes twice in a row to undo their own conversion.
+ColorFrame carries the pixels together with their channel order and colour
+space, and converts lazily: a conversion happens only when a consumer asks
+for a different order, and each conversion is done at most once per frame.
+"""
+
+import threading
+
+import cv2
+
+RGB = "RGB"
+BGR = "BGR"
+GRAY = "GRAY"
+
+# djitellopy 2.x decodes the stream with PyAV into RGB (frame.to_image()), not
+# OpenCV's BGR, so BackgroundFrameRead.frame is RGB
+TELLO_FRAME_ORDER = RGB
+
+# ... and 960x720, the shape DetectorProcess.preload() sizes its shared memory for
+TELLO_FRAME_SHAPE = (720, 960, 3)
+
+# PyAV / swscale pixel formats and the channel order they produce
+FORMAT_ORDERS = {
+    "rgb24": RGB,
+    "bgr24": BGR,
+    "gray": GRAY,
+}
+
+CONVERSIONS = {
+    (RGB, BGR): cv2.COLOR_RGB2BGR,
+    (BGR, RGB): cv2.COLOR_BGR2RGB,
+    (RGB, GRAY): cv2.COLOR_RGB2GRAY,
+    (BGR, GRAY): cv2.COLOR_BGR2GRAY,
+    (GRAY, RGB): cv2.COLOR_GRAY2RGB,
+    (GRAY, BGR): cv2.COLOR_GRAY2BGR,
+}
+
+
+class ColorFrame:
+    """
+
+    Pixels plus their channel order ("RGB", "BGR" or "GRAY") and colour space.
+
+           frame.rgb / frame.bgr / frame.gray   contiguous pixels in that order,
+                                                converted once and cached
+           frame.view("BGR")                    zero-copy channel-reversed view,
+                                                for consumers that copy anyway
+
+    """
+
+    def __init__(self, pixels, order, colorspace="srgb"):
+        if order not in (RGB, BGR, GRAY):
+            raise ValueError(f"Unknown channel order: {order}")
+        self.pixels = pixels
+        self.order = order
+        self.colorspace = colorspace
+        self.converted = {order: pixels}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_format(cls, pixels, format):
+        """Wrap pixels produced by PyAV in the given pixel format"""
+        return cls(pixels, FORMAT_ORDERS[format])
+
+    @property
+    def shape(self):
+        return self.pixels.shape
+
+    def to(self, order):
+        """Return the pixels in the requested channel order, converting at most once"""
+        with self.lock:
+            pixels = self.converted.get(order)
+            if pixels is None:
+                pixels = cv2.cvtColor(self.pixels, CONVERSIONS[(self.order, order)])
+                self.converted[order] = pixels
+            return pixels
+
+    def view(self, order):
+        """RGB <-> BGR as a reversed-channel view without touching the pixels"""
+        if order == self.order:
+            return self.pixels
+        if {order, self.order} == {RGB, BGR}:
+            return self.pixels[..., ::-1]
+        return self.to(order)
+
+    @property
+    def rgb(self):
+        return self.to(RGB)
+
+    @property
+    def bgr(self):
+        return self.to(BGR)
+
+    @property
+    def gray(self):
+        return self.to(GRAY)
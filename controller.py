@@ -1,13 +1,21 @@
 import cv2
 from djitellopy import Tello
+from frame_mailbox import FrameReadPump
 
 def process(tello):
+    # Read frames through a mailbox so each frame is shown only once
+    pump = FrameReadPump(tello.get_frame_read()).start()
+    seq = 0
     while True:
-        frame = tello.get_frame_read().frame
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        cv2.imshow("Frame", frame_rgb)
+        latest = pump.frames.wait_newer(seq, timeout=0.1)
+        if latest is not None:
+            seq, _, frame = latest
+            # The frame knows its channel order, cv2.imshow wants BGR
+            cv2.imshow("Frame", frame.bgr)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
+    pump.stop()
+    print(f"Frames: {pump.frames}")
     cv2.destroyAllWindows()
     tello.end()
 
@@ -0,0 +1,175 @@
+"""
+Run the heavy detector only every N frames and track the boxes in between.
+
+The Tello streams 30 frames per second and the animals we follow barely
+move from one frame to the next, yet every script ran the full detector on
+every frame. DetectionScheduler runs the detector on one frame out of N
+and carries its boxes over the frames in between with median optical
+flow, which costs about 1.5 ms on the 300x300 detector input. N follows
+the measured inference time so the detector uses about `budget` of the
+frame time. A frame is detected early when the tracker loses a box.
+"""
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR
+from detections import Detections
+
+
+class FlowTracker:
+    """
+
+    Moves boxes from frame to frame with pyramidal Lucas-Kanade optical flow.
+
+    A grid of points inside every box is tracked forwards and back again; a
+    point is kept when it comes back within `max_error` pixels. Each box then
+    moves by the median motion of its points and scales by the median change
+    of their spread. A box's quality is the fraction of its points kept.
+
+    """
+
+    def __init__(self, grid=4, max_error=1.0, window=15, levels=2):
+        self.grid = grid
+        self.max_error = max_error
+        self.flow = dict(winSize=(window, window), maxLevel=levels,
+                         criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.gray = None
+        self.detections = Detections()
+
+        # Point positions inside a unit box
+        steps = (np.arange(grid) + 0.5) / grid * 0.6 + 0.2
+        u, v = np.meshgrid(steps, steps)
+        self.offsets = np.stack([u.ravel(), v.ravel()], axis=1).astype(np.float32)
+
+    def reset(self, gray, detections):
+        self.gray = gray
+        self.detections = detections
+
+    def points(self, boxes, size):
+        """(boxes, grid * grid, 2) pixel positions of the points inside normalised boxes"""
+        corner, extent = boxes[:, np.newaxis, :2], boxes[:, np.newaxis, 2:] - boxes[:, np.newaxis, :2]
+        return (corner + self.offsets * extent) * size
+
+    def track(self, gray):
+        """Detections moved to the new frame and the quality of every box"""
+        detections = self.detections
+        if self.gray is None or not len(detections):
+            self.gray = gray
+            return detections, np.ones(len(detections), np.float32)
+
+        size = np.array(gray.shape[1::-1], np.float32)
+        old = self.points(detections.boxes, size)
+        flat = old.reshape(-1, 1, 2)
+        new, status, _ = cv2.calcOpticalFlowPyrLK(self.gray, gray, flat, None, **self.flow)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.gray, new, None, **self.flow)
+
+        error = np.linalg.norm(back - flat, axis=2)[:, 0]
+        valid = ((status[:, 0] == 1) & (back_status[:, 0] == 1) & (error < self.max_error)).reshape(old.shape[:2])
+        new = np.where(valid[..., np.newaxis], new.reshape(old.shape), np.nan)
+        old = np.where(valid[..., np.newaxis], old, np.nan)
+        quality = valid.mean(axis=1)
+
+        tracked = quality > 0
+        new, old = new[tracked], old[tracked]
+        shift = nan_median(new - old)
+        spread_new = nan_median(np.abs(new - nan_median(new)[:, np.newaxis])).mean(axis=1)
+        spread_old = nan_median(np.abs(old - nan_median(old)[:, np.newaxis])).mean(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.clip(np.nan_to_num(spread_new / spread_old, nan=1.0, posinf=1.0), 0.8, 1.25)
+
+        boxes = detections.boxes.copy()
+        centre = (boxes[tracked, :2] + boxes[tracked, 2:]) / 2 + shift / size
+        extent = (boxes[tracked, 2:] - boxes[tracked, :2]) * scale[:, np.newaxis] / 2
+        boxes[tracked] = np.concatenate([centre - extent, centre + extent], axis=1)
+
+        self.gray = gray
+        self.detections = Detections(np.clip(boxes, 0, 1), detections.scores, detections.classes, detections.image)
+        return self.detections, quality
+
+
+def nan_median(values):
+    """
+    Median over axis 1 of (boxes, points, 2) positions where dropped points are NaN,
+    every box having at least one point left. np.nanmedian does the same several
+    times slower on arrays this small.
+    """
+    ordered = np.sort(values, axis=1)  # NaN sorts last
+    count = np.count_nonzero(~np.isnan(values[..., 0]), axis=1)
+    low = np.take_along_axis(ordered, ((count - 1) // 2)[:, np.newaxis, np.newaxis], axis=1)
+    high = np.take_along_axis(ordered, (count // 2)[:, np.newaxis, np.newaxis], axis=1)
+    return ((low + high) / 2)[:, 0]
+
+
+class DetectionScheduler:
+    """
+
+    Detections for every frame from a detector that runs on only some of them.
+
+           detect(image)   image in the backend's channel order -> Detections
+           report()        detector runs, tracked frames and the current interval
+
+    The interval N is chosen so the detector's measured inference time is at
+    most `budget` of `frame_time` (1 / stream fps), between 1 and
+    `max_interval`. The detector also runs as soon as any tracked box falls
+    below `min_quality`. detect() matches the backend's, so a scheduler can
+    stand in for the backend wherever single frames are detected. Larger
+    images (full-resolution frames for a RoiDetector) are tracked at
+    `track_size`, which is enough since the boxes are normalised.
+
+    """
+
+    def __init__(self, backend, budget=0.3, frame_time=1 / 30, max_interval=15, min_quality=0.5, tracker=None,
+                 track_size=(300, 300)):
+        self.backend = backend
+        self.track_size = track_size
+        self.budget = budget
+        self.frame_time = frame_time
+        self.max_interval = max_interval
+        self.min_quality = min_quality
+        self.tracker = tracker or FlowTracker()
+
+        self.interval = 1
+        self.since_detection = None
+        self.detected = 0
+        self.tracked = 0
+        self.early = 0
+        self.track_time = 0.0
+
+    def gray(self, image):
+        width, height = self.track_size
+        if image.shape[1] > width or image.shape[0] > height:
+            image = cv2.resize(image, self.track_size, interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY if self.backend.order == BGR else cv2.COLOR_RGB2GRAY)
+
+    def detect(self, image):
+        gray = self.gray(image)
+
+        if self.since_detection is not None and self.since_detection < self.interval:
+            started = time.perf_counter()
+            detections, quality = self.tracker.track(gray)
+            self.track_time += time.perf_counter() - started
+            if not len(quality) or quality.min() >= self.min_quality:
+                self.since_detection += 1
+                self.tracked += 1
+                return detections
+            self.early += 1  # Tracker lost a box, detect again now
+
+        detections = self.backend.detect(image)
+        self.tracker.reset(gray, detections)
+        self.since_detection = 1
+        self.detected += 1
+
+        # Keep the detector within its share of the frame time
+        self.interval = min(max(math.ceil(self.backend.last_time / (self.budget * self.frame_time)), 1),
+                            self.max_interval)
+        return detections
+
+    def report(self):
+        frames = max(self.detected + self.tracked, 1)
+        track = self.track_time / max(self.tracked, 1)
+        return (f"Scheduler: detector on {self.detected} of {frames} frames ({self.early} early), "
+                f"every {self.interval} frames, tracking {track * 1000:.2f} ms mean")
@@ -0,0 +1,239 @@
+"""
+Detection results as arrays and their vectorised post-processing.
+
+The detect loops walked over all 100 SSD outputs in Python, scaled every
+box on its own and ignored the class ids. Detections keeps a batch of
+results as parallel numpy arrays and PostProcessor filters it in one pass
+of array operations: score threshold, per-class limits, a class allowlist
+and optional non-maximum suppression, with no per-detection Python loop.
+"""
+
+import numpy as np
+
+# COCO ids of the animal classes in the SSD MobileNet graph
+# (bird, cat, dog, horse, sheep, cow, elephant, bear, zebra, giraffe)
+COCO_ANIMALS = (16, 17, 18, 19, 20, 21, 22, 23, 24, 25)
+
+
+class Detections:
+    """
+
+    Detections for a batch of images as parallel arrays.
+
+           boxes     (N, 4) float32   x1, y1, x2, y2 normalised to 0..1
+           scores    (N,)   float32
+           classes   (N,)   int32
+           image     (N,)   int32     index of the image in the batch
+
+    """
+
+    def __init__(self, boxes=None, scores=None, classes=None, image=None):
+        self.boxes = np.zeros((0, 4), np.float32) if boxes is None else np.ascontiguousarray(boxes, np.float32).reshape(-1, 4)
+        n = len(self.boxes)
+        self.scores = np.zeros(n, np.float32) if scores is None else np.ascontiguousarray(scores, np.float32).reshape(n)
+        self.classes = np.zeros(n, np.int32) if classes is None else np.ascontiguousarray(classes, np.int32).reshape(n)
+        self.image = np.zeros(n, np.int32) if image is None else np.ascontiguousarray(image, np.int32).reshape(n)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def select(self, index):
+        """Detections picked by a boolean mask or an index array"""
+        return Detections(self.boxes[index], self.scores[index], self.classes[index], self.image[index])
+
+    def for_image(self, index):
+        return self.select(self.image == index)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls()
+        return cls(np.concatenate([batch.boxes for batch in batches]),
+                   np.concatenate([batch.scores for batch in batches]),
+                   np.concatenate([batch.classes for batch in batches]),
+                   np.concatenate([batch.image for batch in batches]))
+
+    def pixels(self, width, height):
+        """Boxes in pixel coordinates of a width x height image"""
+        return self.boxes * np.array([width, height, width, height], np.float32)
+
+    def labels(self, names=None):
+        """Text labels for drawing, "name score" or "class score" without names"""
+        return [f"{names[cls] if names is not None else cls} {score:.2f}"
+                for cls, score in zip(self.classes.tolist(), self.scores.tolist())]
+
+    def __str__(self):
+        return f"{len(self)} detections"
+
+
+class PostProcessor:
+    """
+
+    Filter Detections with array operations only.
+
+           threshold          minimum score for every class
+           class_thresholds   {class: minimum score} overriding `threshold`
+           classes            allowlist of class ids or names, None keeps every class
+           nms_iou            IoU above which overlapping boxes of the same class in the
+                              same image are suppressed, None disables NMS
+
+    Class names are looked up in the backend's `names` ({id: name} or a list),
+    a name the backend does not know raises ValueError.
+
+    """
+
+    def __init__(self, threshold=0.5, class_thresholds=None, classes=None, nms_iou=None):
+        self.threshold = threshold
+        self.class_thresholds = dict(class_thresholds or {})
+        self.classes = None if classes is None else list(classes)
+        self.nms_iou = nms_iou
+
+        # Per-class score limits indexed by class id, rebuilt when the names change
+        self.table = None
+        self.table_names = None
+
+    def min_threshold(self):
+        """Lowest score any class can pass with"""
+        return min([self.threshold] + list(self.class_thresholds.values()))
+
+    def build_table(self, names):
+        ids = class_ids(names)
+        # An unknown name would otherwise stay in the table as a string that matches nothing,
+        # and an allowlist of only unknown names drops every detection without a word
+        unknown = [c for c in list(self.class_thresholds) + (self.classes or [])
+                   if not isinstance(c, (int, np.integer)) and c not in ids]
+        if unknown:
+            raise ValueError(f"Unknown class names {unknown}, the backend has "
+                             f"{'no class names' if not ids else f'{len(ids)} names'}")
+        thresholds = {ids.get(c, c): t for c, t in self.class_thresholds.items()}
+        allowed = None if self.classes is None else [ids.get(c, c) for c in self.classes]
+
+        known = [c for c in list(thresholds) + (allowed or []) if isinstance(c, (int, np.integer))]
+        size = max(known, default=-1) + 2
+
+        # The last entry is the limit for any class id beyond the table
+        if allowed is None:
+            table = np.full(size, self.threshold, np.float32)
+        else:
+            table = np.full(size, np.inf, np.float32)
+            table[[c for c in allowed if isinstance(c, (int, np.integer))]] = self.threshold
+        for c, t in thresholds.items():
+            if isinstance(c, (int, np.integer)) and np.isfinite(table[c]):
+                table[c] = t
+
+        self.table = table
+        self.table_names = names
+
+    def __call__(self, detections, names=None):
+        if self.table is None or names is not self.table_names:
+            self.build_table(names)
+        if not len(detections):
+            return detections
+
+        limits = self.table[np.minimum(detections.classes, len(self.table) - 1)]
+        detections = detections.select(detections.scores > limits)
+
+        if self.nms_iou is not None and len(detections) > 1:
+            groups = detections.image.astype(np.int64) * (detections.classes.max() + 1) + detections.classes
+            detections = detections.select(fast_nms(detections.boxes, detections.scores, self.nms_iou, groups))
+        return detections
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """
+
+    How well candidate detections reproduce reference ones (e.g. a converted model
+    against the original): (recall, precision, mean IoU of the matches), where a
+    match is a box of the same image and class with IoU >= iou_threshold.
+
+    """
+    matched, ious = 0, []
+    for index in np.unique(reference.image):
+        ref, cand = reference.for_image(index), candidate.for_image(index)
+        if not len(cand):
+            continue
+        iou = box_iou(ref.boxes, cand.boxes)
+        iou[ref.classes[:, np.newaxis] != cand.classes[np.newaxis, :]] = 0
+        best = iou.max(axis=1)
+        matched += int((best >= iou_threshold).sum())
+        ious.extend(best[best >= iou_threshold].tolist())
+    recall = matched / len(reference) if len(reference) else 1.0
+    precision = matched / len(candidate) if len(candidate) else 1.0
+    return recall, precision, float(np.mean(ious)) if ious else 0.0
+
+
+def class_ids(names):
+    """{name: id} for a backend's names, empty when the backend has none"""
+    if names is None:
+        return {}
+    items = names.items() if isinstance(names, dict) else enumerate(names)
+    return {name: int(i) for i, name in items}
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)"""
+    top_left = np.maximum(a[:, np.newaxis, :2], b[np.newaxis, :, :2])
+    bottom_right = np.minimum(a[:, np.newaxis, 2:], b[np.newaxis, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / np.maximum(area_a[:, np.newaxis] + area_b[np.newaxis, :] - intersection, 1e-9)
+
+
+def fast_nms(boxes, scores, iou_threshold, groups=None):
+    """
+
+    Indices of the boxes kept by non-maximum suppression, highest score first.
+
+    "Fast NMS": a box is dropped when any higher scoring box of the same group
+    overlaps it by more than iou_threshold, decided for all boxes at once from
+    the IoU matrix instead of the greedy one-box-at-a-time loop. It can drop a
+    box whose suppressor was itself suppressed, which for the <= 100 boxes of
+    one frame is an acceptable trade for having no Python loop. The IoU matrix
+    is N x N, so thousands of raw candidates go through greedy_nms instead.
+
+    """
+    order = np.argsort(-scores, kind="stable")
+    boxes = boxes[order]
+    if groups is not None:
+        # Shift every group to its own region so boxes of different groups never overlap
+        offset = (np.abs(boxes).max() + 1) * 2
+        boxes = boxes + (groups[order] * offset)[:, np.newaxis]
+
+    iou = np.triu(box_iou(boxes, boxes), k=1)
+    return order[iou.max(axis=0) <= iou_threshold]
+
+
+def greedy_nms(boxes, scores, iou_threshold, groups=None, max_boxes=None):
+    """
+
+    Indices of the boxes kept by greedy non-maximum suppression, highest score first.
+
+    The classic loop, as in torchvision.ops.nms: the best remaining box is kept
+    and every box of its group overlapping it by more than iou_threshold is
+    removed. Boxes removed this way never suppress anything. Only one row of
+    IoUs is computed per kept box, so memory stays O(N) and the loop runs at
+    most `max_boxes` times.
+
+    """
+    order = np.argsort(-scores, kind="stable")
+    boxes = boxes[order]
+    if groups is not None:
+        # Shift every group to its own region so boxes of different groups never overlap
+        offset = (np.abs(boxes).max() + 1) * 2
+        boxes = boxes + (groups[order] * offset)[:, np.newaxis]
+
+    x1, y1, x2, y2 = boxes.T
+    area = (x2 - x1) * (y2 - y1)
+    keep = []
+    remaining = np.arange(len(boxes))
+    while len(remaining) and (max_boxes is None or len(keep) < max_boxes):
+        best, rest = remaining[0], remaining[1:]
+        keep.append(best)
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = width * height
+        iou = intersection / np.maximum(area[best] + area[rest] - intersection, 1e-9)
+        remaining = rest[iou <= iou_threshold]
+    return order[np.array(keep, np.int64)]
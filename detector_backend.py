@@ -0,0 +1,846 @@
+"""
+One interface for the three detector code paths.
+
+The TF frozen-graph session, cv2.dnn and ultralytics YOLO each returned
+results in their own shape and were drawn by their own loop. Every backend
+here has the same load() / warmup() / infer(batch) methods and returns a
+Detections batch: boxes, scores and class ids as contiguous numpy arrays,
+with no per-box Python objects, so backends can be swapped by name with
+create_backend() and their cost compared directly.
+
+Heavy frameworks (tensorflow, ultralytics) are only imported by load().
+Given a ModelCache (model_cache.py), backends build their ready-to-run
+artifact once and load it directly on later launches.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import RGB, BGR
+from detections import Detections, PostProcessor, agreement, fast_nms, greedy_nms
+from frame_pool import FramePool, blob_from_image
+from model_cache import machine_id
+
+
+class DetectorBackend:
+    """
+
+    Base class for detector backends.
+
+           load()          load the model, called by infer() if needed
+           warmup(runs)    run blank frames so the first real frame is not slow
+           infer(batch)    (B, H, W, 3) uint8 array or list of images -> Detections
+           pipeline(items) overlapped prepare / run / postprocess over a stream
+
+    The first load() is timed and printed with whether the model came from a
+    cold or warm cache, see `cached()`.
+
+    Images must be in the channel order given by `order`. When `input_size` is
+    set, images of another size are resized into a pooled batch first. The raw
+    model output goes through `postprocess`, a PostProcessor that by default
+    only applies `threshold`.
+
+    """
+
+    name = None
+    order = RGB
+    input_size = None  # (width, height) the model expects, None = any size
+
+    def __init__(self, threshold=0.5, postprocess=None, cache=None):
+        self.postprocess = postprocess or PostProcessor(threshold)
+        self.names = None
+        self.loaded = False
+        self.pool = FramePool()
+
+        self.cache = cache
+        self.cache_state = None  # "cold" or "warm" once load() used the cache
+        self.load_time = 0.0
+
+        self.runs = 0
+        self.last_time = 0.0
+        self.total_time = 0.0
+        self.dropped = 0  # Frames pipeline() skipped because a newer one arrived
+
+    def load(self):
+        raise NotImplementedError
+
+    def run(self, batch):
+        """Backend specific inference on a prepared batch"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def ensure_loaded(self):
+        """load() if needed, printing how long the startup took"""
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        self.load()
+        self.load_time = time.perf_counter() - started
+        state = f"{self.cache_state} cache" if self.cache_state else "no cache"
+        print(f"Model {self.name}: loaded in {self.load_time:.2f} s ({state})")
+
+    def cached(self, files, settings, suffix, write):
+        """
+        Path of the cached artifact for these model files and settings. On a cold
+        cache write(path) builds it first. Returns None without a cache or when
+        the build fails, so load() falls back to the original model.
+        """
+        if self.cache is None:
+            return None
+        try:
+            path, warm = self.cache.entry(self.name, files, settings, suffix)
+            if not warm:
+                self.cache.build(path, write)
+            self.cache_state = "warm" if warm else "cold"
+            return path
+        except Exception as e:
+            print(f"Error in model cache: {e}")
+            return None
+
+    def warmup(self, runs=1):
+        self.ensure_loaded()
+        width, height = self.input_size or (640, 480)
+        blank = np.zeros((1, height, width, 3), np.uint8)
+        for _ in range(runs):
+            self.run(blank)
+
+    def infer(self, batch):
+        self.ensure_loaded()
+
+        started = time.perf_counter()
+        inputs = self.prepare(batch)
+        try:
+            detections = self.run(inputs)
+        finally:
+            if inputs is not batch:
+                self.pool.release(inputs)
+        detections = self.postprocess(detections, self.names)
+
+        self.last_time = time.perf_counter() - started
+        self.total_time += self.last_time
+        self.runs += 1
+        return detections
+
+    def detect(self, image):
+        """Detections for a single image"""
+        return self.infer(image[np.newaxis])
+
+    def stream(self, frames):
+        """Generator yielding Detections for every frame of a (possibly endless) iterable"""
+        for frame in frames:
+            yield self.detect(frame)
+
+    def pipeline(self, items, depth=1):
+        """
+
+        Generator over (payload, image) pairs yielding (payload, Detections) in order,
+        with the stages of consecutive frames overlapped:
+
+            feed thread        next(items) and prepare() of frame N+1
+            inference thread   run() of frame N
+            caller             postprocess of frame N-1 and whatever it does with it
+
+        TF, cv2.dnn and ONNX Runtime release the GIL while they compute, so the
+        Python work around them runs at the same time. At most `depth` frames wait
+        between two stages. The feed thread never blocks on a busy model: a newer
+        frame replaces a prepared one the model has not taken yet, so the pipeline
+        always works on the latest frame and skipped frames are counted in
+        `self.dropped`. A live stream should be fed from a mailbox that keeps only
+        the newest frame anyway.
+
+        """
+        self.ensure_loaded()
+        stop = threading.Event()
+        prepared, finished = queue.Queue(depth), queue.Queue(depth)
+        done = object()
+
+        def release(item):
+            _, batch, inputs = item
+            if inputs is not batch:
+                self.pool.release(inputs)
+
+        def replace(item):
+            """Queue a prepared frame, dropping the stale one still waiting for the model"""
+            while not stop.is_set():
+                try:
+                    prepared.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+                try:
+                    release(prepared.get_nowait())
+                    self.dropped += 1
+                except queue.Empty:
+                    pass  # The inference thread took it meanwhile
+            release(item)
+            return False
+
+        def put(stage, item):
+            while not stop.is_set():
+                try:
+                    stage.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(stage):
+            while not stop.is_set():
+                try:
+                    return stage.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return done
+
+        def feed():
+            try:
+                for payload, image in items:
+                    batch = image[np.newaxis]
+                    if not replace((payload, batch, self.prepare(batch))):
+                        return
+            except Exception as e:
+                put(prepared, e)
+                return
+            put(prepared, done)
+
+        def infer():
+            while True:
+                item = get(prepared)
+                if item is done or isinstance(item, Exception):
+                    put(finished, item)
+                    return
+                payload, batch, inputs = item
+                try:
+                    started = time.perf_counter()
+                    detections = self.run(inputs)
+                    elapsed = time.perf_counter() - started
+                except Exception as e:
+                    put(finished, e)
+                    return
+                finally:
+                    release(item)
+                if not put(finished, (payload, detections, elapsed)):
+                    return
+
+        threads = [threading.Thread(target=feed, daemon=True), threading.Thread(target=infer, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = get(finished)
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                payload, detections, elapsed = item
+                started = time.perf_counter()
+                detections = self.postprocess(detections, self.names)
+
+                # Only the model's own time, the overlapped stages are not on the critical path
+                self.last_time = elapsed + time.perf_counter() - started
+                self.total_time += self.last_time
+                self.runs += 1
+                yield payload, detections
+        finally:
+            stop.set()
+
+    def prepare(self, batch):
+        """Resize the batch into a pooled (B, H, W, 3) array when the model has a fixed input size"""
+        if self.input_size is None:
+            return batch
+        width, height = self.input_size
+        if isinstance(batch, np.ndarray) and batch.shape[1:3] == (height, width):
+            return batch
+
+        inputs = self.pool.borrow((len(batch), height, width, 3))
+        for i, image in enumerate(batch):
+            cv2.resize(image, (width, height), dst=inputs[i])
+        return inputs
+
+    def report(self):
+        mean = self.total_time / self.runs if self.runs else 0.0
+        dropped = f", {self.dropped} stale frames dropped" if self.dropped else ""
+        return (f"{self.name}: {self.runs} batches, {mean * 1000:.2f} ms mean, last {self.last_time * 1000:.2f} ms"
+                f"{dropped}")
+
+
+class TFGraphBackend(DetectorBackend):
+    """
+
+    SSD MobileNet frozen graph through a tf.compat.v1 Session.
+
+    Loads the original graph, which ends in the TF postprocessing
+    (detection_boxes, ...), as well as the graph written by optimize_graph.py,
+    which ends in the raw "concat" / "concat_1" outputs and is decoded here
+    with the priors from `config_path`. With a cache the optimized graph is
+    built from `model_path` on the first launch and used from then on, but
+    only once it has given the original graph's detections on a test frame
+    (see verify()); otherwise the original graph is loaded.
+
+    """
+
+    name = "tf"
+    input_size = (300, 300)
+    # Test frame for verify(), a blurred noise image when it is missing
+    verify_image = os.path.join(os.path.dirname(os.path.abspath(__file__)), "babi.jpg")
+
+    def __init__(self, model_path="frozen_inference_graph.pb", threshold=0.5,
+                 config_path="ssd_mobilenet_v1_coco_2017_11_17.pbtxt", postprocess=None, cache=None):
+        super().__init__(threshold, postprocess, cache)
+        self.model_path = model_path
+        self.config_path = config_path
+        self.raw = False
+        self.sess = None
+
+    def load(self):
+        import tensorflow as tf
+
+        def optimize(path):
+            from optimize_graph import optimize_frozen_graph
+            optimize_frozen_graph(self.model_path, path, self.input_size[0])
+
+        model_path = self.cached([self.model_path], {"size": self.input_size[0]}, ".pb", optimize)
+        if model_path is not None and not self.verify(model_path):
+            model_path = None
+            self.cache_state = "rejected"
+        model_path = model_path or self.model_path
+
+        # Muat model TensorFlow dari frozen_inference_graph.pb
+        detection_graph = tf.Graph()
+        with detection_graph.as_default():
+            od_graph_def = tf.compat.v1.GraphDef()
+            with tf.io.gfile.GFile(model_path, "rb") as f:
+                od_graph_def.ParseFromString(f.read())
+                tf.import_graph_def(od_graph_def, name="")
+
+        self.sess = tf.compat.v1.Session(graph=detection_graph)
+        self.input_tensor = detection_graph.get_tensor_by_name("image_tensor:0")
+
+        # The optimized graph stops before the TF postprocessing
+        names = {op.name for op in detection_graph.get_operations()}
+        self.raw = "detection_boxes" not in names
+        if self.raw:
+            outputs = ("concat:0", "concat_1:0")
+            self.priors, self.variances, self.nms_iou = ssd_priors(self.config_path, self.input_size[0])
+        else:
+            outputs = ("detection_boxes:0", "detection_scores:0", "detection_classes:0", "num_detections:0")
+        self.outputs = [detection_graph.get_tensor_by_name(name) for name in outputs]
+        # A callable skips the feed/fetch parsing sess.run() does on every call
+        self.session_run = self.sess.make_callable(self.outputs, [self.input_tensor])
+        self.loaded = True
+
+    def verify(self, path, iou=0.9, strict=0.3, loose=0.25):
+        """
+
+        Whether the optimized graph at `path` reproduces the original: every detection
+        of either graph scoring at least `strict` on the test frame is found by the
+        other at `loose` or more, same class and IoU >= `iou`. Checked once per cache
+        entry, the answer is kept in its metadata.
+
+        """
+        metadata = self.cache.metadata(path) or {}
+        if "verified" not in metadata:
+            try:
+                image = cv2.imread(self.verify_image)
+                if image is None:
+                    noise = np.random.default_rng(0).integers(0, 256, (300, 300, 3), np.uint8)
+                    image = cv2.GaussianBlur(noise, (9, 9), 0)
+
+                found = []
+                for model_path in (self.model_path, path):
+                    backend = TFGraphBackend(model_path, config_path=self.config_path, postprocess=PostProcessor(loose))
+                    found.append(backend.detect(np.ascontiguousarray(image[..., ::-1])))
+                    backend.close()
+                original, optimized = found
+                forward, _, _ = agreement(original.select(original.scores >= strict), optimized, iou)
+                backward, _, _ = agreement(optimized.select(optimized.scores >= strict), original, iou)
+                metadata["verified"] = forward == 1.0 and backward == 1.0
+            except Exception as e:
+                print(f"Error in verifying the optimized graph: {e}")
+                metadata["verified"] = False
+            self.cache.save_metadata(path, metadata)
+            if not metadata["verified"]:
+                print("Optimized graph does not match the original, using the original graph")
+        return metadata["verified"]
+
+    def run(self, batch):
+        if self.raw:
+            encodings, logits = self.session_run(batch)
+            return Detections.concat([
+                decode_ssd(encodings[i].reshape(-1, 4), logits[i].reshape(len(self.priors), -1), self.priors,
+                           self.variances, self.postprocess.min_threshold(), self.nms_iou, index=i)
+                for i in range(len(batch))
+            ])
+
+        boxes, scores, classes, num_detections = self.session_run(batch)
+
+        # Only the first num_detections rows of each image are valid
+        image, index = np.nonzero(np.arange(scores.shape[1]) < num_detections[:, np.newaxis])
+
+        # The graph gives (ymin, xmin, ymax, xmax)
+        return Detections(boxes[image, index][:, [1, 0, 3, 2]], scores[image, index], classes[image, index], image)
+
+    def close(self):
+        if self.sess is not None:
+            self.sess.close()
+            self.sess = None
+            self.loaded = False
+
+
+class CvDnnBackend(DetectorBackend):
+    """The same kind of TF graph through cv2.dnn.readNetFromTensorflow, with a cache the config with its input pinned"""
+
+    name = "dnn"
+    input_size = (300, 300)
+
+    def __init__(self, model_path="frozen_inference_graph.pb", config_path="ssd_mobilenet_v1_coco_2017_11_17.pbtxt",
+                 threshold=0.5, swap_rb=False, postprocess=None, cache=None):
+        super().__init__(threshold, postprocess, cache)
+        self.model_path = model_path
+        self.config_path = config_path
+        self.swap_rb = swap_rb  # The frames are RGB already, so no channel swap by default
+        self.net = None
+
+    def load(self):
+        def optimize(path):
+            from optimize_graph import prepare_config
+            prepare_config(self.config_path, path, self.input_size[0])
+
+        config_path = self.cached([self.model_path, self.config_path], {"size": self.input_size[0]}, ".pbtxt",
+                                  optimize) or self.config_path
+        self.net = cv2.dnn.readNetFromTensorflow(self.model_path, config_path)
+        self.loaded = True
+
+    def run(self, batch):
+        width, height = self.input_size
+        with self.pool.buffer((len(batch), 3, height, width), np.float32) as blob:
+            for i in range(len(batch)):
+                blob_from_image(batch[i], blob[i:i + 1], swap_rb=self.swap_rb)
+            self.net.setInput(blob)
+            detections = self.net.forward()
+
+        # Rows are (image id, class, score, x1, y1, x2, y2) for the whole batch
+        detections = detections.reshape(-1, 7)
+        return Detections(detections[:, 3:7], detections[:, 2], detections[:, 1], detections[:, 0])
+
+
+class YoloBackend(DetectorBackend):
+    """
+    Ultralytics YOLOv8, which expects BGR arrays like cv2.imread gives. With a
+    cache, best.pt is exported once to a fused TorchScript model of size imgsz,
+    which later launches load instead of unpickling and fusing the checkpoint.
+    """
+
+    name = "yolo"
+    order = BGR
+    imgsz = 640
+
+    def __init__(self, model_path="best.pt", threshold=0.5, postprocess=None, cache=None):
+        super().__init__(threshold, postprocess, cache)
+        self.model_path = model_path
+        self.model = None
+
+    def load(self):
+        from ultralytics import YOLO
+
+        def export(path):
+            # ultralytics picks the file name itself, the cache moves it into place
+            return YOLO(self.model_path).export(format="torchscript", imgsz=self.imgsz)
+
+        model_path = self.cached([self.model_path], {"imgsz": self.imgsz}, ".torchscript", export)
+        self.model = YOLO(model_path, task="detect") if model_path else YOLO(self.model_path)
+        self.names = self.model.names
+        self.loaded = True
+
+    def run(self, batch):
+        # YOLO already applies NMS, let it drop only what no class limit would keep
+        results = self.model.predict(list(batch), conf=self.postprocess.min_threshold(), verbose=False)
+        return self.to_detections(results)
+
+    @staticmethod
+    def to_detections(results):
+        """Detections from a list of ultralytics Results, one per image"""
+        return Detections.concat([
+            Detections(result.boxes.xyxyn.cpu().numpy(), result.boxes.conf.cpu().numpy(),
+                       result.boxes.cls.cpu().numpy(), np.full(len(result.boxes), i))
+            for i, result in enumerate(results)
+        ])
+
+
+class YoloStreamBackend(YoloBackend):
+    """
+
+    YOLOv8 through one persistent ultralytics predictor, for the live feed.
+
+    model.predict() builds a source loader, checks its arguments and logs to
+    the console on every call. Here load() sets the predictor up once with a
+    fixed input size and verbose output off, and every batch only goes
+    through its preprocess -> inference -> postprocess steps. The time spent
+    in each step is kept in `stage_times`, so the per-frame cost outside the
+    forward pass can be watched in report().
+
+    """
+
+    name = "yolo-stream"
+
+    def __init__(self, model_path="best.pt", threshold=0.5, imgsz=640, half=False, postprocess=None, cache=None):
+        super().__init__(model_path, threshold, postprocess, cache)
+        self.imgsz = imgsz
+        self.half = half  # FP16, only useful on a CUDA device
+        self.predictor = None
+        self.stage_times = {"preprocess": 0.0, "inference": 0.0, "postprocess": 0.0}
+
+    def load(self):
+        import torch
+
+        super().load()
+        self.torch = torch
+
+        # The first predict() call creates model.predictor with these settings,
+        # every later frame reuses it
+        self.model.predict(np.zeros((self.imgsz, self.imgsz, 3), np.uint8), conf=self.postprocess.min_threshold(),
+                           imgsz=self.imgsz, half=self.half, verbose=False)
+        self.predictor = self.model.predictor
+
+    def warmup(self, runs=1):
+        super().warmup(runs)
+        # Only time real frames
+        self.stage_times = dict.fromkeys(self.stage_times, 0.0)
+
+    def run(self, batch):
+        images = list(batch)
+        # postprocess() takes the image paths from the predictor's current batch
+        self.predictor.batch = ([f"frame{i}" for i in range(len(images))], images, [""] * len(images))
+
+        with self.torch.inference_mode():
+            started = time.perf_counter()
+            tensor = self.predictor.preprocess(images)
+            preprocessed = time.perf_counter()
+            preds = self.predictor.inference(tensor)
+            if tensor.is_cuda:
+                self.torch.cuda.synchronize()  # CUDA runs asynchronously, wait so the timing is real
+            inferred = time.perf_counter()
+            results = self.predictor.postprocess(preds, tensor, images)
+            detections = self.to_detections(results)
+
+        self.stage_times["preprocess"] += preprocessed - started
+        self.stage_times["inference"] += inferred - preprocessed
+        self.stage_times["postprocess"] += time.perf_counter() - inferred
+        return detections
+
+    def report(self):
+        runs = max(self.runs, 1)
+        stages = ", ".join(f"{name} {seconds / runs * 1000:.2f} ms" for name, seconds in self.stage_times.items())
+        overhead = (self.total_time - self.stage_times["inference"]) / runs
+        return f"{super().report()} ({stages}, {overhead * 1000:.2f} ms outside the forward pass)"
+
+
+class OnnxYoloBackend(DetectorBackend):
+    """
+
+    YOLOv8 exported to ONNX (see export_onnx.py) on ONNX Runtime's CPU provider.
+
+    Neither torch nor ultralytics is imported, which saves seconds at startup
+    on the field laptops. Letterboxing, box decoding and NMS are done here
+    with numpy following ultralytics' non_max_suppression: candidates above
+    the threshold are capped to the `max_nms` best, go through greedy per-class
+    NMS and at most `max_det` boxes are kept per image.
+    Works for the FP32 and the INT8 quantized export alike. With a cache the
+    graph optimizations are done once and saved as an ORT format model, which
+    later launches load with optimizations off.
+
+    """
+
+    name = "onnx"
+    order = RGB
+
+    def __init__(self, model_path="best.onnx", threshold=0.5, iou=0.7, threads=0, postprocess=None, cache=None,
+                 max_nms=30000, max_det=300):
+        super().__init__(threshold, postprocess, cache)
+        self.model_path = model_path
+        self.iou = iou  # NMS IoU, ultralytics' default
+        self.max_nms = max_nms  # Candidates per image that reach NMS, ultralytics' default
+        self.max_det = max_det  # Boxes kept per image, ultralytics' default
+        self.threads = threads  # 0 lets ONNX Runtime pick
+        self.session = None
+
+    def load(self):
+        import ast
+        import onnxruntime as ort
+
+        def session(path, level, optimized_path=None):
+            options = ort.SessionOptions()
+            options.graph_optimization_level = level
+            options.intra_op_num_threads = self.threads
+            if optimized_path:
+                options.optimized_model_filepath = optimized_path
+                options.add_session_config_entry("session.save_model_format", "ORT")
+            return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        # The ORT format is tied to the runtime version, and ENABLE_ALL to this machine's CPU
+        settings = {"onnxruntime": ort.__version__, "machine": machine_id()}
+        model_path = self.cached([self.model_path], settings, ".ort",
+                                 lambda path: session(self.model_path, ort.GraphOptimizationLevel.ORT_ENABLE_ALL, path))
+        if model_path:
+            self.session = session(model_path, ort.GraphOptimizationLevel.ORT_DISABLE_ALL)
+        else:
+            self.session = session(self.model_path, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.imgsz = model_input.shape[2]
+        # A static export (dynamic=False) only takes batches of exactly this many images
+        self.batch_size = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+        # ultralytics stores the class names as a dict literal in the model metadata
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        self.names = ast.literal_eval(names) if names else None
+        self.loaded = True
+
+    def letterbox(self, batch, blob):
+        """
+
+        Fill an NCHW float32 blob with the images resized to fit imgsz x imgsz, centred
+        on grey padding and scaled to 0..1. Returns the scale and (left, top) padding of
+        every image, to map boxes back.
+
+        """
+        size = self.imgsz
+        scales = np.empty(len(batch), np.float32)
+        pads = np.empty((len(batch), 2), np.float32)
+        with self.pool.buffer((len(batch), size, size, 3)) as canvas:
+            canvas.fill(114)
+            for i, image in enumerate(batch):
+                h, w = image.shape[:2]
+                scale = min(size / h, size / w)
+                width, height = round(w * scale), round(h * scale)
+                left, top = (size - width) // 2, (size - height) // 2
+                cv2.resize(image, (width, height), dst=canvas[i, top:top + height, left:left + width],
+                           interpolation=cv2.INTER_LINEAR)
+                scales[i] = scale
+                pads[i] = (left, top)
+
+            np.copyto(blob, canvas.transpose(0, 3, 1, 2), casting="unsafe")
+        np.multiply(blob, 1 / 255, out=blob)
+        return scales, pads
+
+    def run(self, batch):
+        size = self.imgsz
+        with self.pool.buffer((len(batch), 3, size, size), np.float32) as blob:
+            scales, pads = self.letterbox(batch, blob)
+            step = self.batch_size or len(batch)
+            output = np.concatenate([self.session.run(None, {self.input_name: blob[i:i + step]})[0]
+                                     for i in range(0, len(batch), step)])
+
+        # (B, 4 + classes, anchors) -> best class and score per anchor
+        preds = output.transpose(0, 2, 1)
+        classes = preds[..., 4:].argmax(axis=2)
+        scores = np.take_along_axis(preds[..., 4:], classes[..., np.newaxis], axis=2)[..., 0]
+        image, anchor = np.nonzero(scores > self.postprocess.min_threshold())
+
+        # Centre/size in letterbox pixels -> corners normalised to the original image
+        centre, extent = preds[image, anchor, :2], preds[image, anchor, 2:4] / 2
+        boxes = np.concatenate([centre - extent, centre + extent], axis=1)
+        boxes -= np.tile(pads[image], 2)
+        boxes /= scales[image, np.newaxis]
+        shapes = np.array([frame.shape[1::-1] for frame in batch], np.float32)
+        boxes /= np.tile(shapes[image], 2)
+
+        detections = Detections(np.clip(boxes, 0, 1), scores[image, anchor], classes[image, anchor], image)
+        if len(detections) > 1:
+            detections = Detections.concat([self.nms(detections.for_image(i)) for i in range(len(batch))])
+        return detections
+
+    def nms(self, detections):
+        """Greedy per-class NMS of one image's candidates, capped like ultralytics"""
+        if len(detections) < 2:
+            return detections
+        if len(detections) > self.max_nms:
+            detections = detections.select(np.argsort(-detections.scores, kind="stable")[:self.max_nms])
+        return detections.select(greedy_nms(detections.boxes, detections.scores, self.iou, detections.classes,
+                                            self.max_det))
+
+
+class TFLiteSSDBackend(DetectorBackend):
+    """
+
+    SSD MobileNet v1 converted to TFLite (see export_tflite.py), run with XNNPACK.
+
+    The converted model stops at the raw box encodings and class logits, so it
+    has only builtin ops and needs neither full TensorFlow nor the Flex
+    delegate. Anchor decoding and NMS are done here with numpy, using the
+    prior boxes, variances and NMS settings from the cv2.dnn pbtxt that
+    describes the same graph.
+
+    Runs on tflite_runtime, ai_edge_litert or tensorflow.lite, whichever is
+    installed. `threads` sets the interpreter threads, `xnnpack=False` turns
+    the XNNPACK delegate off for comparison. The .tflite file is already the
+    ready-to-run artifact, so a `cache` is accepted like for the other
+    backends but not used.
+
+    """
+
+    name = "tflite"
+    input_size = (300, 300)
+
+    def __init__(self, model_path="ssd_mobilenet_v1.tflite", config_path="ssd_mobilenet_v1_coco_2017_11_17.pbtxt",
+                 threshold=0.5, threads=4, xnnpack=True, max_detections=100, postprocess=None, cache=None):
+        super().__init__(threshold, postprocess)
+        self.model_path = model_path
+        self.config_path = config_path
+        self.threads = threads
+        self.xnnpack = xnnpack
+        self.max_detections = max_detections
+        self.interpreter = None
+
+    def load(self):
+        interpreter_module = import_tflite()
+        resolver = interpreter_module.OpResolverType
+        self.interpreter = interpreter_module.Interpreter(
+            model_path=self.model_path,
+            num_threads=self.threads,
+            # AUTO applies the default delegates, which is XNNPACK on CPU
+            experimental_op_resolver_type=resolver.AUTO if self.xnnpack else resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES,
+        )
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+
+        # Box encodings end in 4 values per anchor, class logits in one per class
+        outputs = self.interpreter.get_output_details()
+        self.boxes_index = next(o["index"] for o in outputs if o["shape"][-1] == 4)
+        self.classes_index = next(o["index"] for o in outputs if o["shape"][-1] != 4)
+
+        self.priors, self.variances, self.nms_iou = ssd_priors(self.config_path, self.input_size[0])
+        self.loaded = True
+
+    def run(self, batch):
+        width, height = self.input_size
+        results = []
+        with self.pool.buffer((1, height, width, 3), np.float32) as tensor:
+            for i in range(len(batch)):
+                # The graph's own preprocessing: 2 / 255 * x - 1
+                np.multiply(batch[i], 2 / 255, out=tensor[0], casting="unsafe")
+                np.subtract(tensor, 1, out=tensor)
+                self.interpreter.set_tensor(self.input_index, tensor)
+                self.interpreter.invoke()
+                encodings = self.interpreter.get_tensor(self.boxes_index).reshape(-1, 4)
+                logits = self.interpreter.get_tensor(self.classes_index).reshape(len(encodings), -1)
+                results.append(decode_ssd(encodings, logits, self.priors, self.variances,
+                                          self.postprocess.min_threshold(), self.nms_iou, self.max_detections, i))
+        return Detections.concat(results)
+
+    def close(self):
+        self.interpreter = None
+        self.loaded = False
+
+
+def decode_ssd(encodings, logits, priors, variances, threshold, nms_iou, max_detections=100, index=0):
+    """
+
+    SSD CENTER_SIZE decoding and per-class NMS of the raw outputs for one image:
+    (anchors, 4) box encodings and (anchors, classes) logits -> Detections with
+    image index `index`.
+
+    """
+    # Class 0 is the background, the remaining columns are the COCO ids
+    scores = 1 / (1 + np.exp(-logits[:, 1:]))
+    anchor, column = np.nonzero(scores > threshold)
+    if not len(anchor):
+        return Detections()
+
+    # Encodings are (ty, tx, th, tw) relative to the prior's centre and size
+    prior = priors[anchor]
+    code = encodings[anchor] * variances
+    centre = prior[:, :2] + code[:, :2] * prior[:, 2:]
+    extent = prior[:, 2:] * np.exp(code[:, 2:]) / 2
+    yx = np.concatenate([centre - extent, centre + extent], axis=1)
+
+    detections = Detections(np.clip(yx[:, [1, 0, 3, 2]], 0, 1), scores[anchor, column], column + 1,
+                            np.full(len(anchor), index))
+    detections = detections.select(fast_nms(detections.boxes, detections.scores, nms_iou, detections.classes))
+    return detections.select(slice(0, max_detections))
+
+
+def import_tflite():
+    """The TFLite interpreter module from the lightest package that is installed"""
+    try:
+        from tflite_runtime import interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert import interpreter
+        except ImportError:
+            from tensorflow.lite.python import interpreter
+    return interpreter
+
+
+def ssd_priors(config_path="ssd_mobilenet_v1_coco_2017_11_17.pbtxt", size=300):
+    """
+
+    Prior boxes of the SSD graph as (N, 4) normalised (y, x, height, width), plus the
+    encoding variances and the NMS IoU, read from the PriorBox and DetectionOutput
+    nodes of the cv2.dnn pbtxt. Anchors are ordered by feature map, then row,
+    column and box, like the graph's concatenated outputs.
+
+    """
+    with open(config_path) as f:
+        nodes = re.split(r"\nnode \{", f.read())
+
+    priors, variances, nms_iou = [], None, 0.6
+    for node in nodes:
+        if 'op: "PriorBox"' in node:
+            heights, widths = np.array(pbtxt_floats(node, "height")), np.array(pbtxt_floats(node, "width"))
+            variances = pbtxt_floats(node, "variance")
+            priors.append((heights / size, widths / size))
+        elif 'op: "DetectionOutput"' in node:
+            match = re.search(r'key: "nms_threshold"\s*value \{\s*f: ([\d.]+)', node)
+            if match:
+                nms_iou = float(match.group(1))
+
+    # Feature maps halve (rounding up) from 19x19 for a 300x300 input
+    anchors = []
+    cells = int(np.ceil(size / 16))
+    for heights, widths in priors:
+        centres = (np.arange(cells) + 0.5) / cells
+        y, x = np.meshgrid(centres, centres, indexing="ij")
+        grid = np.stack([y.ravel(), x.ravel()], axis=1)
+        boxes = np.empty((len(grid), len(heights), 4), np.float32)
+        boxes[..., :2] = grid[:, np.newaxis, :]
+        boxes[..., 2] = heights
+        boxes[..., 3] = widths
+        anchors.append(boxes.reshape(-1, 4))
+        cells = (cells + 1) // 2
+
+    # cv2.dnn lists the variances as (x, y, w, h), the encodings are (ty, tx, th, tw)
+    variances = np.array(variances or [0.1, 0.1, 0.2, 0.2], np.float32)[[1, 0, 3, 2]]
+    return np.concatenate(anchors), variances, nms_iou
+
+
+def pbtxt_floats(node, key):
+    """The float_val list of a tensor attribute in one pbtxt node"""
+    match = re.search(r'key: "%s"\s*value \{\s*tensor \{(.*?)tensor_shape' % key, node, re.S)
+    return [float(v) for v in re.findall(r"float_val: ([\d.eE+-]+)", match.group(1))]
+
+
+BACKENDS = {
+    "tf": TFGraphBackend,
+    "dnn": CvDnnBackend,
+    "yolo": YoloBackend,
+    "yolo-stream": YoloStreamBackend,
+    "onnx": OnnxYoloBackend,
+    "tflite": TFLiteSSDBackend,
+}
+
+
+def create_backend(name, **options):
+    """Create a backend by name ("tf", "dnn", "yolo", "yolo-stream", "onnx" or "tflite"), options go to its constructor"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name}")
+    return BACKENDS[name](**options)
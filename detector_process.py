@@ -0,0 +1,300 @@
+"""
+Run the detector in its own process and exchange frames through shared memory.
+
+Inference, Tk, pygame and the djitellopy threads used to share one Python
+process and one GIL. DetectorProcess moves the model into a worker process:
+frames are copied into a ring of multiprocessing.shared_memory slots, only
+(slot, seq) travels over the request queue, and the worker sends back compact
+arrays (boxes, scores, class ids). A heartbeat and per-request timeouts detect
+a hung or crashed worker, which is then restarted automatically in the
+background, backing off exponentially while it keeps failing to start.
+
+The worker is built by a picklable factory returning a DetectorBackend, e.g.
+functools.partial(create_backend, "yolo", model_path="best.pt", threshold=0.5).
+"""
+
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detections import Detections
+
+
+def worker_main(factory, shm_name, shape, slots, requests, results, heartbeat):
+    """Entry point of the detector process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots,) + shape, np.uint8, buffer=shm.buf)
+
+    # Beat from a thread so a long inference still counts as alive, while a
+    # worker stuck holding the GIL does not
+    def beat():
+        while True:
+            heartbeat.value = time.time()
+            time.sleep(0.2)
+
+    threading.Thread(target=beat, daemon=True).start()
+
+    backend = None
+    try:
+        backend = factory()
+        backend.warmup()
+        results.put(("ready", backend.names))
+
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            slot, seq = message
+            try:
+                detections = backend.detect(frames[slot])
+                results.put(("result", slot, seq, detections.boxes, detections.scores, detections.classes))
+            except Exception as e:
+                results.put(("error", slot, seq, str(e)))
+    finally:
+        del frames
+        shm.close()
+        if backend is not None:
+            print(f"Detector backend: {backend.report()}")
+            backend.close()
+
+
+class DetectorProcess:
+    """
+
+    Detector running in a separate process.
+
+           detect(image)   copy a frame into a free slot and wait for its result,
+                           returns Detections, empty on failure
+           submit(image)   copy a frame into a free slot without waiting, returns its
+                           sequence number or None when every slot is busy
+           poll(timeout)   next (seq, Detections) from the worker, or None
+           preload(shape)  start the worker for frames of `shape` now, so the model
+                           loads while the drone connects instead of on the first frame
+
+    The shared memory ring is sized from the first frame (or preload()). A worker that dies, stops
+    sending heartbeats or misses a request timeout is restarted. Starting happens in
+    a background thread, outside the lock, and frames get empty Detections (submit
+    gets None) until the worker is ready. A start that fails is retried after
+    `backoff` seconds, doubling up to `max_backoff`; after `max_failures` failed
+    starts in a row the detector gives up and stays empty.
+
+    """
+
+    def __init__(self, factory, slots=3, timeout=5.0, heartbeat_timeout=2.0, start_timeout=120.0,
+                 backoff=1.0, max_backoff=60.0, max_failures=5):
+        # The spawned worker gets the factory pickled, so fail here rather than on every launch
+        try:
+            pickle.dumps(factory)
+        except Exception as e:
+            raise TypeError(f"Detector factory cannot be sent to the worker process: {e}") from e
+
+        self.factory = factory
+        self.slots = slots
+        self.timeout = timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.start_timeout = start_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_failures = max_failures
+
+        # Spawn a clean interpreter: forking a process that runs Tk and video threads is unsafe
+        self.context = multiprocessing.get_context("spawn")
+
+        self.lock = threading.Lock()
+        self.process = None
+        self.shm = None
+        self.frames = None
+        self.shape = None
+        self.names = None
+        self.busy = set()
+        self.seq = 0
+
+        self.starter = None   # Thread starting the worker, frames are refused meanwhile
+        self.stopping = threading.Event()  # Tells a start in progress to give up
+        self.failures = 0     # Failed starts in a row
+        self.retry_at = 0.0   # No new start before this time
+        self.failed = False   # Gave up, or stopped
+
+        self.restarts = 0
+        self.errors = 0
+        self.completed = 0
+
+    def start(self, shape):
+        """Create the shared memory ring for frames of `shape` and start the worker"""
+        try:
+            self.shape = tuple(shape)
+            size = self.slots * int(np.prod(self.shape))
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.frames = np.ndarray((self.slots,) + self.shape, np.uint8, buffer=self.shm.buf)
+            self.busy = set()
+
+            self.requests = self.context.Queue()
+            self.results = self.context.Queue()
+            self.heartbeat = self.context.Value("d", time.time())
+            self.process = self.context.Process(
+                target=worker_main,
+                args=(self.factory, self.shm.name, self.shape, self.slots, self.requests, self.results, self.heartbeat),
+                daemon=True,
+            )
+            self.process.start()
+
+            # Wait for the model to load before accepting frames
+            deadline = time.time() + self.start_timeout
+            while time.time() < deadline and not self.stopping.is_set():
+                try:
+                    message = self.results.get(timeout=0.5)
+                except queue.Empty:
+                    if not self.process.is_alive():
+                        break
+                    continue
+                if message[0] == "ready":
+                    self.names = message[1]
+                    return
+            raise RuntimeError("Detector process stopped while starting" if self.stopping.is_set()
+                               else "Detector process failed to start")
+        except BaseException:
+            # Also unlinks the shared memory, which would otherwise outlive a failed start
+            self.shutdown()
+            raise
+
+    def shutdown(self):
+        """Stop the worker and release the shared memory"""
+        if self.process is not None:
+            try:
+                self.requests.put(None)
+                self.process.join(timeout=1.0)
+            except Exception:
+                pass
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+            self.process = None
+        if self.shm is not None:
+            self.frames = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def stop(self):
+        with self.lock:
+            self.failed = True  # No new starts
+            starter = self.starter
+        if starter is not None:
+            # A start in progress notices within its 0.5 s poll and cleans up after itself
+            self.stopping.set()
+            starter.join(timeout=2.0)
+        with self.lock:
+            self.shutdown()
+
+    def preload(self, shape):
+        with self.lock:
+            if self.process is None:
+                self.launch(shape)
+
+    def launch(self, shape):
+        """(Re)start the worker in the background, unless it is starting already, backing off or given up"""
+        if self.starter is not None or self.failed or time.time() < self.retry_at:
+            return
+        # Only replacing a worker that ran counts as a restart, not another try after a failed start
+        if self.process is not None:
+            print("Restarting detector process")
+            self.restarts += 1
+        elif self.failures:
+            print(f"Starting detector process, attempt {self.failures + 1} of {self.max_failures}")
+        self.starter = threading.Thread(target=self.relaunch, args=(shape,), daemon=True)
+        self.starter.start()
+
+    def relaunch(self, shape):
+        try:
+            self.shutdown()
+            self.start(shape)
+            self.failures = 0
+        except Exception as e:
+            if self.stopping.is_set():
+                return
+            self.failures += 1
+            delay = min(self.backoff * 2 ** (self.failures - 1), self.max_backoff)
+            self.retry_at = time.time() + delay
+            if self.failures >= self.max_failures:
+                self.failed = True
+                print(f"Error in detector process: {e}, giving up after {self.failures} attempts")
+            else:
+                print(f"Error in detector process: {e}, retrying in {delay:g} s")
+        finally:
+            with self.lock:
+                self.starter = None
+
+    def healthy(self):
+        """Whether the worker is alive and its heartbeat is recent"""
+        return (self.process is not None and self.process.is_alive()
+                and time.time() - self.heartbeat.value < self.heartbeat_timeout)
+
+    def submit(self, image):
+        with self.lock:
+            return self.submit_locked(image)
+
+    def submit_locked(self, image):
+        if self.starter is not None or self.failed:
+            return None
+        if self.process is None or image.shape != self.shape or not self.healthy():
+            self.launch(image.shape)
+            return None
+
+        free = [slot for slot in range(self.slots) if slot not in self.busy]
+        if not free:
+            return None
+
+        slot = free[0]
+        np.copyto(self.frames[slot], image)
+        self.busy.add(slot)
+        self.seq += 1
+        self.requests.put((slot, self.seq))
+        return self.seq
+
+    def poll(self, timeout=0.0):
+        try:
+            message = self.results.get(timeout=timeout) if timeout else self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+        if message[0] == "result":
+            _, slot, seq, boxes, scores, classes = message
+            self.busy.discard(slot)
+            self.completed += 1
+            return seq, Detections(boxes, scores, classes)
+        if message[0] == "error":
+            _, slot, seq, error = message
+            self.busy.discard(slot)
+            self.errors += 1
+            print(f"Error in detector process: {error}")
+            return seq, Detections()
+        return None
+
+    def detect(self, image):
+        """Run one frame through the worker and wait for its detections"""
+        with self.lock:
+            seq = self.submit_locked(image)
+            if seq is None:
+                return Detections()
+
+            deadline = time.time() + self.timeout
+            while time.time() < deadline:
+                result = self.poll(timeout=0.05)
+                if result is not None and result[0] == seq:
+                    return result[1]
+                if result is None and not self.healthy():
+                    break
+
+            # No answer in time: the worker is hung or dead
+            self.errors += 1
+            self.launch(self.shape)
+            return Detections()
+
+    def report(self):
+        state = ", gave up starting" if self.failures >= self.max_failures else ""
+        return f"{self.completed} frames detected, {self.errors} errors, {self.restarts} restarts{state}"
@@ -1,9 +1,9 @@
-import cv2
-import av
 from djitellopy import Tello
-from PIL import Image, ImageTk
+from tk_render import TkRenderer
 import tkinter as tk
 import threading
+from startup_timer import StartupTimer
+from video_decode import decode_frames, FrameDecoder, open_stream
 
 
 class TelloApp:
@@ -11,19 +11,29 @@ class TelloApp:
         self.master = master
         self.master.title("DJI Tello Video Feed")
 
+        # Catat waktu setiap langkah startup sampai frame pertama tampil
+        self.timer = StartupTimer()
+
         # Inisialisasi Tello
         self.tello = Tello()
         self.tello.connect()
+        self.timer.mark("connect")
         print(f"Battery Level: {self.tello.get_battery()}%")
         self.tello.streamon()
+        self.timer.mark("streamon")
 
-        # Dekoder video
-        self.container = av.open(self.tello.get_udp_video_address())
+        # Dekoder video (mode: "default", "slice", "frame" atau "low_delay")
+        self.container = open_stream(self.tello.get_udp_video_address(), mode="low_delay", timer=self.timer)
+        self.decoder = FrameDecoder("rgb24")
 
         # Label untuk menampilkan video
         self.video_label = tk.Label(master)
         self.video_label.pack()
 
+        # Renderer yang memakai ulang satu PhotoImage, frame digambar di thread utama Tk
+        self.renderer = TkRenderer(self.video_label, timer=self.timer)
+        self.renderer.start()
+
         # Tombol untuk keluar
         self.quit_button = tk.Button(master, text="Quit", command=self.quit)
         self.quit_button.pack()
@@ -37,21 +47,17 @@ class TelloApp:
         self.video_thread.start()
 
     def update_video(self):
-        for frame in self.container.decode(video=0):
+        for frame in decode_frames(self.container, self.timer):
             if not self.running:
                 break
 
             try:
-                # Konversi frame ke RGB
-                frame_rgb = cv2.cvtColor(frame.to_ndarray(format="bgr24"), cv2.COLOR_BGR2RGB)
-
-                # Konversi ke format Tkinter
-                img = Image.fromarray(frame_rgb)
-                imgtk = ImageTk.PhotoImage(image=img)
+                # Konversi frame langsung ke RGB oleh dekoder, tanpa cvtColor tambahan. Frame tidak
+                # di-release karena renderer Tk masih memegangnya setelah submit
+                frame_rgb = self.decoder.convert(frame)
 
-                # Update UI di thread utama
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
+                # Serahkan ke renderer, frame lama dilewati jika Tk tertinggal
+                self.renderer.submit(frame_rgb)
 
             except Exception as e:
                 print(f"Error while decoding video: {e}")
@@ -60,6 +66,8 @@ class TelloApp:
 
     def quit(self):
         self.running = False
+        self.renderer.stop()
+        print(f"Render: {self.renderer.report()}")
         self.tello.streamoff()
         self.tello.end()
         self.container.close()
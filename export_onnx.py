@@ -0,0 +1,110 @@
+"""
+Export best.pt to ONNX for the "onnx" detector backend, optionally as INT8.
+
+The FP32 export is done once by ultralytics on a machine with torch. The
+INT8 model is made with ONNX Runtime static quantization, calibrated on
+local images that go through exactly the same letterboxing as the backend
+uses at run time. The detect head (the last "/model.N/" block) stays in
+FP32: quantizing the box regression and class scores costs much more
+accuracy than it saves time.
+
+Run with: python export_onnx.py [model.pt] [--int8] [--images babi.jpg gajah.jpeg monyet.jpg]
+"""
+
+import argparse
+import os
+import re
+
+import cv2
+import numpy as np
+
+from detector_backend import OnnxYoloBackend
+
+CALIBRATION_IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+
+
+def export_onnx(model_path="best.pt", imgsz=640):
+    """Export a YOLOv8 .pt model to ONNX with a fixed input size, returns the .onnx path"""
+    from ultralytics import YOLO
+
+    return YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+
+
+class CalibrationReader:
+    """ONNX Runtime calibration data reader feeding letterboxed images one at a time"""
+
+    def __init__(self, backend, paths):
+        self.backend = backend
+        self.paths = list(paths)
+
+    def get_next(self):
+        while self.paths:
+            image = cv2.imread(self.paths.pop(0))
+            if image is None:
+                continue
+            # The backend expects RGB, cv2.imread gives BGR
+            blob = np.empty((1, 3, self.backend.imgsz, self.backend.imgsz), np.float32)
+            self.backend.letterbox([image[..., ::-1]], blob)
+            return {self.backend.input_name: blob}
+        return None
+
+
+def head_nodes(onnx_path):
+    """Names of the nodes in the YOLO detect head, the last /model.N/ block"""
+    import onnx
+
+    nodes = [node.name for node in onnx.load(onnx_path).graph.node]
+    blocks = [int(m) for name in nodes for m in re.findall(r"^/model\.(\d+)/", name)]
+    if not blocks:
+        return []
+    head = f"/model.{max(blocks)}/"
+    return [name for name in nodes if name.startswith(head)]
+
+
+def quantize_int8(onnx_path, images=CALIBRATION_IMAGES, output_path=None):
+    """Statically quantize an exported model to INT8, returns the quantized model's path"""
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if output_path is None:
+        output_path = os.path.splitext(onnx_path)[0] + "-int8.onnx"
+
+    # Shape inference and graph cleanup first, as ONNX Runtime recommends
+    prepared_path = os.path.splitext(onnx_path)[0] + "-prep.onnx"
+    quant_pre_process(onnx_path, prepared_path, skip_symbolic_shape=True)  # The export has a fixed shape
+
+    backend = OnnxYoloBackend(onnx_path)
+    backend.load()
+    try:
+        quantize_static(
+            prepared_path,
+            output_path,
+            CalibrationReader(backend, images),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=head_nodes(prepared_path),
+        )
+    finally:
+        os.remove(prepared_path)
+    return output_path
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", nargs="?", default="best.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="also write a statically quantized INT8 model")
+    parser.add_argument("--images", nargs="+", default=CALIBRATION_IMAGES, help="calibration images for --int8")
+    args = parser.parse_args()
+
+    onnx_path = args.model if args.model.endswith(".onnx") else export_onnx(args.model, args.imgsz)
+    print(f"ONNX model: {onnx_path}")
+    if args.int8:
+        print(f"INT8 model: {quantize_int8(onnx_path, args.images)}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,80 @@
+"""
+Convert the SSD MobileNet v1 frozen graph to TFLite for the "tflite" backend.
+
+The graph is cut between the preprocessing and the TF postprocessing: the
+input is "Preprocessor/sub" (the 300x300 image already scaled to -1..1) and
+the outputs are "concat" (raw box encodings) and "concat_1" (class logits).
+What is left is plain convolutions that every TFLite build and XNNPACK can
+run; the anchor decoding and NMS are done by TFLiteSSDBackend.
+
+    --quantize fp16   FP16 weights, half the file size, dequantized at load
+    --quantize int8   INT8 weights and activations, calibrated on local images,
+                      with float input and output so the backend is unchanged
+
+The conversion needs full TensorFlow once; the result runs with tflite_runtime.
+
+Run with: python export_tflite.py [frozen_inference_graph.pb] [--quantize fp16|int8] [--images ...]
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+INPUT_ARRAY = "Preprocessor/sub"
+OUTPUT_ARRAYS = ["concat", "concat_1"]
+CALIBRATION_IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+
+
+def representative_dataset(images, size=300):
+    """Calibration inputs preprocessed like the graph does: RGB, size x size, 2 / 255 * x - 1"""
+    def generate():
+        for path in images:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            image = cv2.resize(image[..., ::-1], (size, size)).astype(np.float32)
+            yield [(image * (2 / 255) - 1)[np.newaxis]]
+    return generate
+
+
+def convert(graph_path="frozen_inference_graph.pb", output_path=None, quantize=None, images=CALIBRATION_IMAGES):
+    """Convert the frozen graph to a .tflite file, returns its path"""
+    import tensorflow as tf
+
+    if output_path is None:
+        output_path = "ssd_mobilenet_v1.tflite" if quantize is None else f"ssd_mobilenet_v1-{quantize}.tflite"
+
+    converter = tf.compat.v1.lite.TFLiteConverter.from_frozen_graph(
+        graph_path,
+        input_arrays=[INPUT_ARRAY],
+        output_arrays=OUTPUT_ARRAYS,
+        input_shapes={INPUT_ARRAY: [1, 300, 300, 3]},
+    )
+    if quantize == "fp16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(images)
+    elif quantize is not None:
+        raise ValueError(f"Unknown quantization: {quantize}")
+
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("graph", nargs="?", default="frozen_inference_graph.pb")
+    parser.add_argument("--output")
+    parser.add_argument("--quantize", choices=["fp16", "int8"])
+    parser.add_argument("--images", nargs="+", default=CALIBRATION_IMAGES, help="calibration images for int8")
+    args = parser.parse_args()
+
+    print(f"TFLite model: {convert(args.graph, args.output, args.quantize, args.images)}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,147 @@
+"""
+Latest-frame mailbox for the Tello video feed.
+
+BackgroundFrameRead.frame only ever holds "the current frame", so a reader
+cannot tell whether it has already seen it. The mailbox keeps a single slot
+with a sequence number and capture timestamp, lets consumers block until a
+frame newer than the one they last handled arrives, and counts how many
+frames were overwritten before anyone read them.
+"""
+
+import threading
+import time
+
+from color_frame import ColorFrame, TELLO_FRAME_ORDER
+
+
+class FrameMailbox:
+    """Single-slot mailbox holding the most recent frame"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.frame = None
+        self.seq = 0            # Sequence number of the frame in the slot, 0 = empty
+        self.timestamp = 0.0    # time.perf_counter() when the frame was captured
+        self.read = True        # Whether anyone has taken the frame in the slot
+        self.overwritten = 0    # Frames replaced before any consumer took them
+        self.closed = False
+
+    def put(self, frame, timestamp=None):
+        """Publish a new frame and wake up any waiting consumers, returns its sequence number"""
+        with self.condition:
+            if not self.read:
+                self.overwritten += 1
+            self.frame = frame
+            self.seq += 1
+            self.timestamp = time.perf_counter() if timestamp is None else timestamp
+            self.read = False
+            self.condition.notify_all()
+            return self.seq
+
+    def get_latest(self):
+        """Return (seq, timestamp, frame) for the frame in the slot without waiting"""
+        with self.condition:
+            if self.seq:
+                self.read = True
+            return self.seq, self.timestamp, self.frame
+
+    def wait_newer(self, seq, timeout=None):
+        """
+
+        Block until a frame with a sequence number greater than `seq` is available.
+
+        Returns (seq, timestamp, frame), or None on timeout or when the mailbox is closed.
+
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > seq or self.closed, timeout):
+                return None
+            if self.closed:
+                return None
+            self.read = True
+            return self.seq, self.timestamp, self.frame
+
+    def take(self, timeout=None):
+        """
+
+        Single-consumer get: wait until the frame in the slot has not been taken yet.
+
+        Returns (seq, timestamp, frame), or None on timeout or when the mailbox is closed.
+
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: (self.seq and not self.read) or self.closed, timeout):
+                return None
+            if self.closed:
+                return None
+            self.read = True
+            return self.seq, self.timestamp, self.frame
+
+    def close(self):
+        """Wake up every waiting consumer and make further waits return None"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def drop_rate(self):
+        """Fraction of published frames that nobody consumed"""
+        with self.condition:
+            return self.overwritten / self.seq if self.seq else 0.0
+
+    def __str__(self):
+        return f"{self.seq} frames published, {self.overwritten} overwritten ({self.drop_rate() * 100:.1f}%)"
+
+
+class FrameReadPump:
+    """
+
+    Capture worker that moves frames from a djitellopy BackgroundFrameRead into a mailbox.
+
+    BackgroundFrameRead replaces its `frame` attribute with a new array for every decoded
+    frame, so a frame is new exactly when the object changes. Only new frames are
+    published, optionally passed through `transform` first (e.g. a resize), as a
+    ColorFrame tagged with `order`.
+    When a StartupTimer is given, "first_frame" is marked on the first publish.
+
+    """
+
+    def __init__(self, frame_read, transform=None, poll_interval=0.002, timer=None, order=TELLO_FRAME_ORDER):
+        self.frame_read = frame_read
+        self.transform = transform
+        self.order = order
+        self.timer = timer
+        self.poll_interval = poll_interval
+        self.frames = FrameMailbox()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.frames.close()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def run(self):
+        last_frame = None
+        while self.running:
+            frame = self.frame_read.frame
+            if frame is None or frame is last_frame:
+                time.sleep(self.poll_interval)
+                continue
+
+            last_frame = frame
+            timestamp = time.perf_counter()
+            try:
+                if self.transform is not None:
+                    frame = self.transform(frame)
+                self.frames.put(ColorFrame(frame, self.order), timestamp)
+                if self.timer:
+                    self.timer.mark("first_frame")
+            except Exception as e:
+                print(f"Error in frame pump: {e}")
@@ -0,0 +1,91 @@
+"""
+Preallocated frame buffers for the per-frame OpenCV hot loop.
+
+cv2.resize, cv2.cvtColor, np.expand_dims + blobFromImage and the overlay copy
+each allocated a fresh full-size array on every frame. FramePool hands out
+buffers keyed by shape and dtype that stages borrow, fill through `dst=`
+outputs and give back, so a long flight allocates them once.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class FramePool:
+    """Free lists of numpy buffers keyed by (shape, dtype)"""
+
+    def __init__(self, max_free=4):
+        self.max_free = max_free  # Buffers kept per key, extra releases are dropped
+        self.lock = threading.Lock()
+        self.free = {}
+        self.allocated = 0
+        self.reused = 0
+
+    def borrow(self, shape, dtype=np.uint8):
+        """Return a buffer with the given shape and dtype, its contents are undefined"""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            buffers = self.free.get(key)
+            if buffers:
+                self.reused += 1
+                return buffers.pop()
+            self.allocated += 1
+        return np.empty(shape, dtype)
+
+    def release(self, array):
+        """Give a borrowed buffer back to the pool"""
+        key = (array.shape, array.dtype.str)
+        with self.lock:
+            buffers = self.free.setdefault(key, [])
+            if len(buffers) < self.max_free:
+                buffers.append(array)
+
+    @contextmanager
+    def buffer(self, shape, dtype=np.uint8):
+        """Borrow a buffer for the duration of a with block"""
+        array = self.borrow(shape, dtype)
+        try:
+            yield array
+        finally:
+            self.release(array)
+
+    def copy(self, frame):
+        """Pooled equivalent of frame.copy(), release the result when done"""
+        out = self.borrow(frame.shape, frame.dtype)
+        np.copyto(out, frame)
+        return out
+
+    def __str__(self):
+        return f"{self.allocated} buffers allocated, {self.reused} reused"
+
+
+def blob_from_image(image, blob, scale=1.0, mean=0.0, swap_rb=False):
+    """
+
+    Write an HxWxC image that already has the network input size into an
+    NCHW float32 blob, like cv2.dnn.blobFromImage(image, scale, mean=mean,
+    swapRB=swap_rb, crop=False) but without allocating a new blob.
+
+    `mean` is a per-channel tuple in blob channel order, as OpenCV expects it
+    with swapRB. A single number is subtracted from every channel, where
+    OpenCV would read it as (mean, 0, 0, 0).
+
+    """
+    channels = image.transpose(2, 0, 1)
+    if swap_rb:
+        channels = channels[::-1]
+
+    out = blob[0]
+    np.copyto(out, channels, casting="unsafe")
+    if np.any(mean):
+        # A per-channel mean is in blob channel order, which is what OpenCV subtracts once
+        # swapRB has been applied, so it is only broadcast over H and W here
+        mean = np.asarray(mean, np.float32)
+        if mean.ndim:
+            mean = mean[:out.shape[0]].reshape(-1, 1, 1)
+        np.subtract(out, mean, out=out)
+    if scale != 1.0:
+        np.multiply(out, scale, out=out)
+    return blob
@@ -0,0 +1,140 @@
+"""
+On-disk cache of ready-to-run model artifacts.
+
+Every launch used to re-parse frozen_inference_graph.pb, re-import it into
+a new tf.Graph, re-create the cv2.dnn network or re-load and fuse best.pt
+before the first detection. Backends given a ModelCache build their
+optimized artifact once (ORT-format model, folded graph, TorchScript
+export, ...) and load it directly on later launches. Entries are keyed by
+the SHA-256 of the model files, the backend and its settings, so changing
+any of them builds a new entry.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import threading
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache")
+
+
+def machine_id():
+    """
+
+    Short hash of the CPU architecture, model and instruction set flags, for artifacts
+    that are only valid on the hardware they were built on (ONNX Runtime's ENABLE_ALL
+    optimizations pick kernels and layouts for the CPU's vector extensions).
+
+    """
+    cpu = [platform.machine(), platform.processor()]
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() in ("model name", "flags", "Features"):
+                    cpu.append(value.strip())
+                elif not line.strip() and len(cpu) > 2:
+                    break  # The first CPU is enough
+    except OSError:
+        pass  # No /proc on Windows and macOS, the processor string has to do
+    return hashlib.sha256("\n".join(cpu).encode()).hexdigest()[:16]
+
+
+class ModelCache:
+    """
+
+    Directory of cached model artifacts.
+
+           entry(backend, files, settings, suffix)   -> (path, warm)
+           build(path, write)                        create an entry atomically
+           metadata(path) / save_metadata(path, m)   small JSON side file per entry
+
+    File hashes are remembered by (size, mtime), so a warm start does not
+    re-read large model files.
+
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.hashes = None
+
+    def __repr__(self):
+        # Caches of the same directory are interchangeable, see ModelRegistry.key()
+        return f"ModelCache({self.directory!r})"
+
+    def __getstate__(self):
+        # A cache travels to DetectorProcess workers inside the backend factory. The lock
+        # cannot be pickled and the remembered hashes are re-read from the index anyway
+        return {"directory": self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"])
+
+    def index_path(self):
+        return os.path.join(self.directory, "hashes.json")
+
+    def file_hash(self, path):
+        """SHA-256 of a file, reusing the stored value while its size and mtime are unchanged"""
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        path = os.path.abspath(path)
+
+        with self.lock:
+            if self.hashes is None:
+                try:
+                    with open(self.index_path()) as f:
+                        self.hashes = json.load(f)
+                except (OSError, ValueError):
+                    self.hashes = {}
+
+            known = self.hashes.get(path)
+            if known and known["stamp"] == stamp:
+                return known["sha256"]
+
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self.hashes[path] = {"stamp": stamp, "sha256": digest.hexdigest()}
+
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.index_path(), "w") as f:
+                json.dump(self.hashes, f)
+            return self.hashes[path]["sha256"]
+
+    def entry(self, backend, files, settings=None, suffix=""):
+        """Path of the entry for these model files and settings, and whether it already exists"""
+        key = json.dumps({
+            "backend": backend,
+            "files": [self.file_hash(path) for path in files],
+            "settings": settings or {},
+        }, sort_keys=True)
+        name = f"{backend}-{hashlib.sha256(key.encode()).hexdigest()[:16]}{suffix}"
+        path = os.path.join(self.directory, name)
+        return path, os.path.exists(path)
+
+    def build(self, path, write):
+        """Create an entry by calling write(temporary path), then moving it into place"""
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp{os.path.splitext(path)[1]}"
+        try:
+            result = write(temporary)
+            # Some writers (exports) choose their own output path and return it
+            os.replace(result if isinstance(result, str) and os.path.exists(result) else temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return path
+
+    def metadata(self, path):
+        try:
+            with open(path + ".json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_metadata(self, path, metadata):
+        with open(path + ".json", "w") as f:
+            json.dump(metadata, f)
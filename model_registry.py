@@ -0,0 +1,108 @@
+"""
+Process-wide registry of loaded detector backends.
+
+Scripts used to build the same model more than once (a module-level
+YOLO('best.pt') and another one per window), doubling memory and startup
+time, and the first live frame then paid for the lazy initialization. The
+registry loads every model once per process, warms it up on a blank frame
+and hands the same backend to everyone who asks for it. preload() does
+this in a background thread, so the model loads while the drone connects.
+"""
+
+import threading
+import time
+
+from detector_backend import create_backend
+
+
+class ModelEntry:
+    """One backend being loaded or ready, with its load and warm-up times"""
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+        self.backend = None
+        self.error = None
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+        self.ready = threading.Event()
+
+    def load(self, warmup_runs=1):
+        try:
+            started = time.perf_counter()
+            backend = create_backend(self.name, **self.options)
+            backend.ensure_loaded()
+            loaded = time.perf_counter()
+            backend.warmup(warmup_runs)
+            self.load_time = loaded - started
+            self.warmup_time = time.perf_counter() - loaded
+            self.backend = backend
+        except Exception as e:
+            print(f"Error loading model {self.name}: {e}")
+            self.error = e
+        finally:
+            self.ready.set()
+
+
+class ModelRegistry:
+    """
+
+    Loads every (backend name, options) combination once per process.
+
+           preload(name, **options)   start loading in the background, returns at once
+           get(name, **options)       the loaded and warmed-up backend, waits for it if needed
+           report()                   load and warm-up time of every model
+
+    Options are compared by value, except objects such as a PostProcessor,
+    which must be the same instance to share an entry.
+
+    """
+
+    def __init__(self, warmup_runs=1):
+        self.warmup_runs = warmup_runs
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    @staticmethod
+    def key(name, options):
+        return name, tuple(sorted((key, repr(value)) for key, value in options.items()))
+
+    def entry(self, name, options, background):
+        """The entry for this model, created and loading if it is new"""
+        with self.lock:
+            key = self.key(name, options)
+            entry = self.entries.get(key)
+            if entry is not None:
+                return entry
+            entry = self.entries[key] = ModelEntry(name, options)
+
+        if background:
+            threading.Thread(target=entry.load, args=(self.warmup_runs,), daemon=True).start()
+        else:
+            entry.load(self.warmup_runs)
+        return entry
+
+    def preload(self, name, **options):
+        self.entry(name, options, background=True)
+
+    def get(self, name, **options):
+        entry = self.entry(name, options, background=False)
+        entry.ready.wait()
+        if entry.error is not None:
+            raise RuntimeError(f"Model {name} failed to load: {entry.error}")
+        return entry.backend
+
+    def report(self):
+        lines = ["Models:"]
+        for entry in self.entries.values():
+            if not entry.ready.is_set():
+                lines.append(f"  {entry.name:<12} loading")
+            elif entry.error is not None:
+                lines.append(f"  {entry.name:<12} failed: {entry.error}")
+            else:
+                lines.append(f"  {entry.name:<12} load {entry.load_time:.2f} s, warm-up {entry.warmup_time:.2f} s")
+        return "\n".join(lines)
+
+
+# Shared by everything in the process
+registry = ModelRegistry()
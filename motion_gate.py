@@ -0,0 +1,88 @@
+"""
+Skip the detector on frames where nothing has moved.
+
+Hovering over a paddock, consecutive Tello frames are nearly identical,
+yet the detector ran on every one of them. MotionGate shrinks each frame
+to a small grey thumbnail and compares it with the thumbnail of the last
+frame the detector actually saw. While the mean difference stays under
+`threshold` the previous result is reused, for at most `max_age` frames.
+The check costs well under a tenth of a millisecond on a 960x720 frame.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from color_frame import BGR, RGB
+
+
+class MotionGate:
+    """
+
+    Reuse the last detections while the scene stays still.
+
+           detect(image)   Detections, from the detector or reused
+           report()        gated and inferred frames, and the detector time saved
+
+    `detector` is anything with detect(image): a backend, a DetectorProcess,
+    a RoiDetector or a DetectionScheduler. `threshold` is the mean absolute
+    difference of the `size` grey thumbnails, in 0..255 grey levels. Images
+    come in `order`, by default the detector's (give it for a DetectorProcess).
+
+    """
+
+    def __init__(self, detector, threshold=3.0, size=(64, 48), max_age=15, order=None):
+        self.detector = detector
+        self.order = order or getattr(detector, "order", RGB)
+        self.threshold = threshold
+        self.size = size
+        self.max_age = max_age
+
+        self.reference = None  # Thumbnail of the last frame the detector saw
+        self.result = None
+        self.age = 0
+        self.last_difference = 0.0
+
+        self.last_time = 0.0
+        self.gated = 0
+        self.inferred = 0
+        self.infer_time = 0.0
+
+    @property
+    def names(self):
+        return self.detector.names
+
+    def thumbnail(self, image):
+        # Sample down to twice the size, then average: a fraction of the cost of INTER_AREA
+        # on the full frame. Only the thumbnail is converted to grey.
+        width, height = self.size
+        small = cv2.resize(image, (width * 2, height * 2), interpolation=cv2.INTER_LINEAR)
+        small = cv2.resize(small, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 2:
+            return small
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY if self.order == BGR else cv2.COLOR_RGB2GRAY)
+
+    def detect(self, image):
+        thumbnail = self.thumbnail(image)
+        if self.reference is not None and self.age < self.max_age:
+            self.last_difference = float(np.mean(cv2.absdiff(thumbnail, self.reference)))
+            if self.last_difference < self.threshold:
+                self.age += 1
+                self.gated += 1
+                return self.result
+
+        started = time.perf_counter()
+        self.result = self.detector.detect(image)
+        self.last_time = time.perf_counter() - started
+        self.infer_time += self.last_time
+        self.inferred += 1
+        self.reference = thumbnail
+        self.age = 0
+        return self.result
+
+    def report(self):
+        frames = max(self.gated + self.inferred, 1)
+        saved = self.gated * self.infer_time / max(self.inferred, 1)
+        return (f"Motion gate: {self.gated} of {frames} frames reused ({self.gated / frames:.0%}), "
+                f"{self.inferred} inferred, about {saved:.1f} s of detector time saved")
@@ -0,0 +1,292 @@
+"""
+Offline optimizer for the SSD MobileNet v1 graph.
+
+    frozen_inference_graph.pb               -> frozen_inference_graph_opt.pb
+    ssd_mobilenet_v1_coco_2017_11_17.pbtxt  -> ssd_mobilenet_v1_coco_2017_11_17_opt.pbtxt
+
+The frozen graph (TF Session backend) is cut down to what a live 300x300
+feed needs:
+
+    - the input is fixed at (-1, 300, 300, 3) uint8 and fed straight into the
+      preprocessing arithmetic, bypassing the per-image resize while loop
+    - Assert and other debug nodes and all control dependencies are dropped
+    - the TF postprocessing is cut off at the raw "concat" / "concat_1"
+      outputs, which TFGraphBackend decodes itself
+    - constant subgraphs are evaluated once and stored as constants
+    - batch-norm scales are folded into the convolution weights and the
+      offsets turned into BiasAdd
+    - Identity nodes and everything unreachable from the outputs are removed
+
+The cv2.dnn text config is only prepared, not pruned: its input is pinned to
+(-1, 300, 300, 3) and control dependencies and debug nodes are dropped. On the
+shipped ssd_mobilenet_v1_coco_2017_11_17.pbtxt that changes the two -1
+placeholder dimensions and removes one "^FeatureExtractor/Assert/Assert"
+input, all 172 nodes stay. cv2.dnn keeps reading the weights from the
+original .pb, so the two stay consistent.
+
+The .pb part needs TensorFlow, the .pbtxt part only the standard library.
+Load time and per-frame latency of both backends are reported before and
+after. No gains are claimed until those numbers exist: the repository does
+not ship frozen_inference_graph.pb, so run this next to the model files.
+
+Run with: python optimize_graph.py [frozen_inference_graph.pb] [config.pbtxt]
+"""
+
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector_backend import create_backend
+
+RAW_OUTPUTS = ["concat", "concat_1"]
+DEBUG_OPS = {"Assert", "CheckNumerics", "Print", "PrintV2", "NoOp"}
+CONTROL_FLOW_OPS = {"Enter", "Exit", "Switch", "Merge", "NextIteration", "LoopCond", "TensorArrayV3",
+                    "TensorArrayReadV3", "TensorArrayWriteV3", "TensorArrayScatterV3", "TensorArrayGatherV3",
+                    "TensorArraySizeV3", "Placeholder", "PlaceholderWithDefault"}
+IMAGES = ["babi.jpg", "gajah.jpeg", "monyet.jpg"]
+RUNS = 20
+
+
+def node_name(input_name):
+    """Node name of an input reference such as "^name" or "name:1\""""
+    return input_name.lstrip("^").split(":")[0]
+
+
+def prepare_config(config_path, output_path, size=300):
+    """Pin the cv2.dnn text graph input to size x size and drop debug nodes, returns (nodes before, nodes after)"""
+    with open(config_path) as f:
+        blocks = re.findall(r"^node \{\n(.*?)^\}\n", f.read(), re.M | re.S)
+
+    nodes = []
+    for body in blocks:
+        name = re.search(r'^  name: "(.*)"$', body, re.M).group(1)
+        op = re.search(r'^  op: "(.*)"$', body, re.M).group(1)
+        nodes.append((name, op, body))
+
+    # Debug ops and control dependencies do nothing for inference
+    nodes = [(name, op, body) for name, op, body in nodes if op not in DEBUG_OPS]
+    nodes = [(name, op, re.sub(r'^  input: "\^.*"\n', "", body, flags=re.M)) for name, op, body in nodes]
+
+    with open(output_path, "w") as f:
+        for name, op, body in nodes:
+            if op == "Placeholder":
+                body = fixed_placeholder(name, body, size)
+            f.write("node {\n" + body + "}\n")
+    return len(blocks), len(nodes)
+
+
+def fixed_placeholder(name, body, size):
+    """Text for a Placeholder node with shape (-1, size, size, 3)"""
+    dtype = re.search(r"type: (DT_\w+)", body).group(1)
+    dims = "".join(f"        dim {{\n          size: {d}\n        }}\n" for d in (-1, size, size, 3))
+    return (f'  name: "{name}"\n  op: "Placeholder"\n'
+            f'  attr {{\n    key: "dtype"\n    value {{\n      type: {dtype}\n    }}\n  }}\n'
+            f'  attr {{\n    key: "shape"\n    value {{\n      shape {{\n{dims}      }}\n    }}\n  }}\n')
+
+
+def optimize_frozen_graph(graph_path, output_path, size=300):
+    """Write the pruned and folded frozen graph, returns (nodes before, nodes after)"""
+    import tensorflow as tf
+
+    graph_def = tf.compat.v1.GraphDef()
+    with open(graph_path, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    before = len(graph_def.node)
+    nodes = {node.name: node for node in graph_def.node}
+
+    # Fixed-size uint8 frames go straight into 2 / 255 * x - 1, skipping the resize loop
+    image = nodes["image_tensor"]
+    image.attr["shape"].shape.CopyFrom(tf.TensorShape([None, size, size, 3]).as_proto())
+    cast = graph_def.node.add()
+    cast.name, cast.op = "Preprocessor/Cast", "Cast"
+    cast.input.append("image_tensor")
+    cast.attr["SrcT"].type = tf.uint8.as_datatype_enum
+    cast.attr["DstT"].type = tf.float32.as_datatype_enum
+    mul = nodes["Preprocessor/mul"]
+    for i, name in enumerate(mul.input):
+        if nodes[node_name(name)].op != "Const":
+            mul.input[i] = cast.name
+
+    # Control dependencies only point at Asserts and other checks
+    for node in graph_def.node:
+        data_inputs = [name for name in node.input if not name.startswith("^")]
+        del node.input[:]
+        node.input.extend(data_inputs)
+
+    graph_def = tf.compat.v1.graph_util.extract_sub_graph(graph_def, RAW_OUTPUTS)
+    graph_def = fold_constants(graph_def)
+    graph_def = tf.compat.v1.graph_util.remove_training_nodes(graph_def, protected_nodes=RAW_OUTPUTS)
+    graph_def = fold_batch_norms(graph_def)
+    graph_def = tf.compat.v1.graph_util.remove_training_nodes(graph_def, protected_nodes=RAW_OUTPUTS)
+    graph_def = tf.compat.v1.graph_util.extract_sub_graph(graph_def, RAW_OUTPUTS)
+
+    with open(output_path, "wb") as f:
+        f.write(graph_def.SerializeToString())
+    return before, len(graph_def.node)
+
+
+def fold_constants(graph_def):
+    """Evaluate every subgraph that only depends on constants and store the results as Const nodes"""
+    import tensorflow as tf
+
+    nodes = {node.name: node for node in graph_def.node}
+    constant = {name for name, node in nodes.items() if node.op == "Const"}
+    changed = True
+    while changed:
+        changed = False
+        for name, node in nodes.items():
+            if (name not in constant and node.input and node.op not in CONTROL_FLOW_OPS
+                    and all(node_name(i) in constant for i in node.input)):
+                constant.add(name)
+                changed = True
+
+    # Only the constant nodes that feed non-constant ones need a value, and only
+    # single-output ones can be replaced by one Const
+    multi_output = {node_name(i) for node in graph_def.node for i in node.input if ":" in i and not i.endswith(":0")}
+    frontier = sorted({node_name(i) for node in graph_def.node if node.name not in constant
+                       for i in node.input if node_name(i) in constant and nodes[node_name(i)].op != "Const"}
+                      - multi_output)
+    if not frontier:
+        return graph_def
+
+    with tf.Graph().as_default() as graph:
+        tf.import_graph_def(graph_def, name="")
+        with tf.compat.v1.Session(graph=graph) as sess:
+            values = sess.run([f"{name}:0" for name in frontier])
+
+    for name, value in zip(frontier, values):
+        node = nodes[name]
+        del node.input[:]
+        node.op = "Const"
+        node.attr.clear()
+        node.attr["dtype"].type = tf.as_dtype(value.dtype).as_datatype_enum
+        node.attr["value"].tensor.CopyFrom(tf.make_tensor_proto(value))
+    return graph_def
+
+
+def fold_batch_norms(graph_def):
+    """Fold Mul-by-constant after a convolution into its weights and turn Add-constant into BiasAdd"""
+    import tensorflow as tf
+
+    nodes = {node.name: node for node in graph_def.node}
+    consumers = {}
+    for node in graph_def.node:
+        for name in node.input:
+            consumers[node_name(name)] = consumers.get(node_name(name), 0) + 1
+
+    def const(name):
+        node = nodes.get(node_name(name))
+        return node if node is not None and node.op == "Const" else None
+
+    for node in list(graph_def.node):
+        if node.op == "Mul" and len(node.input) == 2:
+            conv_input, scale_input = node.input if const(node.input[1]) else reversed(node.input)
+            conv, scale = nodes.get(node_name(conv_input)), const(scale_input)
+            if (conv is None or scale is None or conv.op not in ("Conv2D", "DepthwiseConv2dNative")
+                    or consumers.get(conv.name) != 1 or const(conv.input[1]) is None
+                    or consumers.get(node_name(conv.input[1])) != 1):
+                continue
+
+            weights = const(conv.input[1])
+            w = tf.make_ndarray(weights.attr["value"].tensor)
+            s = tf.make_ndarray(scale.attr["value"].tensor)
+            channels = w.shape[3] if conv.op == "Conv2D" else w.shape[2] * w.shape[3]
+            if s.size != channels:
+                continue
+            if conv.op == "Conv2D":
+                w = w * s.reshape(-1)
+            else:
+                # Depthwise weights are (h, w, channels, multiplier), output channel c * m
+                w = w * s.reshape(w.shape[2], w.shape[3])
+            weights.attr["value"].tensor.CopyFrom(tf.make_tensor_proto(w.astype(np.float32)))
+
+            # The Mul becomes a pass-through that remove_training_nodes drops
+            node.op = "Identity"
+            del node.input[:]
+            node.input.append(conv.name)
+
+        elif node.op in ("Add", "AddV2") and len(node.input) == 2:
+            x, bias = node.input if const(node.input[1]) else reversed(node.input)
+            bias_node = const(bias)
+            if bias_node is None or const(x) is not None:
+                continue
+            # BiasAdd only matches Add for a float per-channel vector on a 4-D NHWC tensor, so
+            # only the batch-norm offset right after a convolution (and its folded scale) is rewritten
+            source = nodes.get(node_name(x))
+            while source is not None and source.op in ("Identity", "Mul"):
+                source = nodes.get(node_name(next((name for name in source.input if not const(name)), "")))
+            if source is None or source.op not in ("Conv2D", "DepthwiseConv2dNative"):
+                continue
+            weights = const(source.input[1])
+            if weights is None:
+                continue
+            shape = tf.make_ndarray(weights.attr["value"].tensor).shape
+            channels = shape[3] if source.op == "Conv2D" else shape[2] * shape[3]
+            bias_value = tf.make_ndarray(bias_node.attr["value"].tensor)
+            if bias_value.dtype != np.float32 or bias_value.shape != (channels,):
+                continue
+            node.op = "BiasAdd"
+            del node.input[:]
+            node.input.extend([x, bias])
+            node.attr["data_format"].s = b"NHWC"
+    return graph_def
+
+
+def measure(name, **options):
+    """(load s, latency s per frame) of a backend on the sample images"""
+    images = [np.ascontiguousarray(cv2.imread(path)[..., ::-1]) for path in IMAGES]
+    backend = create_backend(name, **options)
+    started = time.perf_counter()
+    backend.load()
+    load_time = time.perf_counter() - started
+    backend.warmup()
+
+    started = time.perf_counter()
+    for _ in range(RUNS):
+        for image in images:
+            backend.detect(image)
+    latency = (time.perf_counter() - started) / (RUNS * len(images))
+    backend.close()
+    return load_time, latency
+
+
+def compare(label, before, after):
+    results = []
+    for options in (before, after):
+        try:
+            results.append(measure(**options))
+        except Exception as e:
+            print(f"{label:<5} skipped: {e}")
+            return
+    (load_before, latency_before), (load_after, latency_after) = results
+    print(f"{label:<5} load {load_before:6.2f} s -> {load_after:6.2f} s   "
+          f"latency {latency_before * 1000:7.2f} ms -> {latency_after * 1000:7.2f} ms")
+
+
+def run(graph_path="frozen_inference_graph.pb", config_path="ssd_mobilenet_v1_coco_2017_11_17.pbtxt"):
+    graph_output = os.path.splitext(graph_path)[0] + "_opt.pb"
+    config_output = os.path.splitext(config_path)[0] + "_opt.pbtxt"
+
+    before, after = prepare_config(config_path, config_output)
+    print(f"{config_output}: {before} -> {after} nodes, "
+          f"{os.path.getsize(config_path) // 1024} -> {os.path.getsize(config_output) // 1024} KiB")
+
+    try:
+        before, after = optimize_frozen_graph(graph_path, graph_output)
+        print(f"{graph_output}: {before} -> {after} nodes, "
+              f"{os.path.getsize(graph_path) // 1024} -> {os.path.getsize(graph_output) // 1024} KiB")
+    except Exception as e:
+        print(f"Frozen graph not optimized: {e}")
+
+    compare("tf", {"name": "tf", "model_path": graph_path},
+            {"name": "tf", "model_path": graph_output, "config_path": config_output})
+    compare("dnn", {"name": "dnn", "model_path": graph_path, "config_path": config_path},
+            {"name": "dnn", "model_path": graph_path, "config_path": config_output})
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:3])
@@ -0,0 +1,171 @@
+"""
+SORT multi-object tracking with persistent IDs, kept entirely in arrays.
+
+Detections used to be drawn and forgotten, so nothing knew that the
+monkey in frame 101 is the one from frame 100. SortTracker follows every
+box with a constant velocity Kalman filter, as in SORT (Bewley et al.,
+2016), and matches the predictions to each frame's detections through
+one IoU matrix. All tracks live in a handful of numpy arrays and the
+predict / update steps are batched over all of them, so there are no
+per-track objects and no per-track Python loop.
+"""
+
+import numpy as np
+
+from detections import Detections, box_iou
+
+# Boxes are normalised 0..1, the filter works in units of 1/1000 of the
+# frame so SORT's noise settings, tuned for pixels, carry over
+UNITS = 1000.0
+
+# State is (centre x, centre y, area, aspect ratio, and the velocities of the first three)
+F = np.eye(7, dtype=np.float64)
+F[0, 4] = F[1, 5] = F[2, 6] = 1
+H = np.eye(4, 7, dtype=np.float64)
+R = np.diag([1.0, 1.0, 10.0, 10.0])
+Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+
+
+def to_state(boxes):
+    """(N, 4) normalised xyxy -> (N, 4) centre, area, aspect ratio measurements"""
+    boxes = boxes.astype(np.float64) * UNITS
+    size = boxes[:, 2:] - boxes[:, :2]
+    centre = boxes[:, :2] + size / 2
+    return np.column_stack([centre, size[:, 0] * size[:, 1], size[:, 0] / np.maximum(size[:, 1], 1e-6)])
+
+
+def to_boxes(state):
+    """(N, >= 4) states -> (N, 4) normalised xyxy"""
+    area = np.maximum(state[:, 2], 0)
+    width = np.sqrt(area * state[:, 3])
+    height = area / np.maximum(width, 1e-6)
+    extent = np.column_stack([width, height]) / 2
+    return np.concatenate([state[:, :2] - extent, state[:, :2] + extent], axis=1) / UNITS
+
+
+class SortTracker:
+    """
+
+    Tracks boxes across frames and gives each one a stable ID.
+
+           update(detections)   Detections of one frame -> (Detections, ids) of the tracks
+                                seen in this frame, boxes smoothed by the filter
+           boxes()              boxes of all live tracks, for region-of-interest inference
+           counts               {class id: number of distinct confirmed tracks so far}
+
+    A detection joins the prediction of the same class it overlaps most, if
+    that overlap is at least `iou_threshold`. Matching is greedy in order of
+    IoU, which for the few well separated animals of a frame gives the same
+    pairs as SORT's Hungarian assignment. A track is reported once it has
+    `min_hits` detections and dropped after `max_age` frames without one.
+
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=5, min_hits=3):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+
+        self.state = np.zeros((0, 7))          # Kalman state per track
+        self.covariance = np.zeros((0, 7, 7))  # Kalman covariance per track
+        self.ids = np.zeros(0, np.int64)
+        self.classes = np.zeros(0, np.int32)
+        self.scores = np.zeros(0, np.float32)
+        self.hits = np.zeros(0, np.int32)      # Frames with a matching detection
+        self.misses = np.zeros(0, np.int32)    # Frames since the last matching detection
+
+        self.next_id = 1
+        self.frames = 0
+        self.counts = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predict(self):
+        # An area about to turn negative stops shrinking instead
+        self.state[self.state[:, 2] + self.state[:, 6] <= 0, 6] = 0
+        self.state = self.state @ F.T
+        self.covariance = F @ self.covariance @ F.T + Q
+
+    def correct(self, tracks, measurements):
+        """Kalman update of the given tracks with one (4,) measurement each"""
+        covariance = self.covariance[tracks]
+        innovation = measurements - self.state[tracks, :4]
+        gain = covariance[:, :, :4] @ np.linalg.inv(covariance[:, :4, :4] + R)
+        self.state[tracks] += (gain @ innovation[:, :, np.newaxis])[:, :, 0]
+        self.covariance[tracks] = covariance - gain @ covariance[:, :4, :]
+
+    def match(self, boxes, classes):
+        """Greedy IoU matching of track predictions to detections -> (track indices, detection indices)"""
+        if not len(self.ids) or not len(boxes):
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+        iou = box_iou(to_boxes(self.state), boxes)
+        iou[self.classes[:, np.newaxis] != classes[np.newaxis, :]] = 0
+        tracks, detections = np.nonzero(iou >= self.iou_threshold)
+        order = np.argsort(-iou[tracks, detections], kind="stable")
+
+        # Usually every track overlaps only its own detection and this loop takes each pair once
+        used_tracks, used_detections = set(), set()
+        matched = []
+        for t, d in zip(tracks[order].tolist(), detections[order].tolist()):
+            if t not in used_tracks and d not in used_detections:
+                used_tracks.add(t)
+                used_detections.add(d)
+                matched.append((t, d))
+        matched = np.array(matched, np.int64).reshape(-1, 2)
+        return matched[:, 0], matched[:, 1]
+
+    def update(self, detections):
+        self.frames += 1
+        self.predict()
+        self.misses += 1
+
+        tracks, matched = self.match(detections.boxes, detections.classes)
+        measurements = to_state(detections.boxes)
+        if len(tracks):
+            self.correct(tracks, measurements[matched])
+            self.hits[tracks] += 1
+            self.misses[tracks] = 0
+            self.scores[tracks] = detections.scores[matched]
+
+        # Unmatched detections start new tracks
+        new = np.ones(len(detections), bool)
+        new[matched] = False
+        count = int(new.sum())
+        if count:
+            state = np.zeros((count, 7))
+            state[:, :4] = measurements[new]
+            self.state = np.concatenate([self.state, state])
+            self.covariance = np.concatenate([self.covariance, np.broadcast_to(P0, (count, 7, 7))])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+            self.classes = np.concatenate([self.classes, detections.classes[new]])
+            self.scores = np.concatenate([self.scores, detections.scores[new]])
+            self.hits = np.concatenate([self.hits, np.ones(count, np.int32)])
+            self.misses = np.concatenate([self.misses, np.zeros(count, np.int32)])
+            self.next_id += count
+
+        # Count every track once, when it is confirmed
+        for cls in self.classes[(self.hits == self.min_hits) & (self.misses == 0)].tolist():
+            self.counts[cls] = self.counts.get(cls, 0) + 1
+
+        keep = self.misses <= self.max_age
+        if not keep.all():
+            for name in ("state", "covariance", "ids", "classes", "scores", "hits", "misses"):
+                setattr(self, name, getattr(self, name)[keep])
+
+        # Tracks matched in this frame, early frames report tentative tracks too like SORT does
+        shown = (self.misses == 0) & ((self.hits >= self.min_hits) | (self.frames <= self.min_hits))
+        tracked = Detections(np.clip(to_boxes(self.state[shown]), 0, 1), self.scores[shown], self.classes[shown])
+        return tracked, self.ids[shown]
+
+    def boxes(self):
+        """(T, 4) normalised boxes of every live track, including tentative and missed ones"""
+        return np.clip(to_boxes(self.state), 0, 1).astype(np.float32)
+
+    @staticmethod
+    def labels(detections, ids, names=None):
+        """Text labels "#id name" for drawing tracked detections"""
+        return [f"#{i} {names[cls] if names is not None else cls}"
+                for i, cls in zip(ids.tolist(), detections.classes.tolist())]
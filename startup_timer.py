@@ -0,0 +1,32 @@
+"""
+Time-to-first-frame measurements for bringing up the Tello video feed.
+
+Operators wait on connect -> streamon -> first picture every sortie, so each
+step is marked once and the whole breakdown is printed when the first frame
+reaches the screen.
+"""
+
+import time
+
+
+class StartupTimer:
+    """Record when each startup step finished, relative to the timer's creation"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.events = {}
+
+    def mark(self, name):
+        """Record a step the first time it happens, returns True only on that first call"""
+        if name in self.events:
+            return False
+        self.events[name] = time.perf_counter() - self.start
+        return True
+
+    def report(self):
+        lines = ["Startup timings:"]
+        previous = 0.0
+        for name, elapsed in self.events.items():
+            lines.append(f"  {name:<15} {elapsed:6.2f} s  (+{elapsed - previous:.2f} s)")
+            previous = elapsed
+        return "\n".join(lines)
@@ -10,18 +10,23 @@ from djitellopy import tello
 import threading
 # import our flight commands
 from flight_commands import start_flying, stop_flying
-from ultralytics import YOLO
+from model_registry import registry
+from video_pipeline import draw_boxes
 
 
 import av
 import numpy as np
 
-model = YOLO('best.pt')
+# YOLOv8 dimuat sekali per proses oleh registry
+ANIMAL_MODEL = dict(model_path='best.pt', threshold=0.5)  # Gunakan confidence threshold yang sesuai
 
 # Class for controlling the drone via keyboard commands
 class DroneController:
     def __init__(self):
 
+        # Start loading YOLO in the background while the drone connects
+        registry.preload('yolo', **ANIMAL_MODEL)
+
         # Initialize the Tkinter window, give it a title, and define its minimum size on the screen.
         self.root = Tk()
         self.root.title("Drone Keyboard Controller - Tkinter")
@@ -40,7 +45,7 @@ class DroneController:
         # Define a speed for the drone to fly at
         self.drone.speed = 25
 
-        self.animal_model = YOLO('best.pt')
+        self.animal_model = None
         
         # Label for displaying video stream
         self.cap_lbl = Label(self.root)
@@ -178,11 +183,17 @@ class DroneController:
             # Read a frame from the drone
             frame = self.frame.frame
 
-            # Jalankan deteksi menggunakan model YOLOv8
-            results = self.animal_model.predict(frame, conf=0.5)  # Gunakan confidence threshold yang sesuai
+            # Model yang sudah dimuat dan di-warm-up, menunggu preload jika belum selesai
+            if self.animal_model is None:
+                self.animal_model = registry.get('yolo', **ANIMAL_MODEL)
+                print(registry.report())
+
+            # Jalankan deteksi menggunakan model YOLOv8, frame Tello RGB dan YOLO mengharapkan BGR
+            detections = self.animal_model.detect(frame[..., ::-1])
 
             # Visualisasi frame yang telah diberi anotasi
-            annotated_frame = results[0].plot()
+            annotated_frame = draw_boxes(frame.copy(), detections.pixels(frame.shape[1], frame.shape[0]),
+                                         detections.labels(self.animal_model.names))
 
             # Konversi frame dari OpenCV ke PIL untuk ditampilkan di Tkinter
             img = Image.fromarray(annotated_frame)
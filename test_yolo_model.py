@@ -1,29 +1,22 @@
 import cv2
-from ultralytics import YOLO
+from detector_backend import create_backend
 
 # Load model YOLOv8
-model = YOLO('best.pt')  # Ganti dengan path ke model YOLOv8 Anda
+model = create_backend('yolo', model_path='best.pt', threshold=0.5)  # Ganti dengan path ke model YOLOv8 Anda
+model.load()
 
 # Load gambar untuk pengujian
 image_path = 'babi.jpg'  # Ganti dengan path gambar Anda
 img = cv2.imread(image_path)
 
-# Deteksi objek dengan YOLO
-results = model(img)
+# Deteksi objek dengan YOLO (cv2.imread memberi BGR, sesuai yang diharapkan YOLO)
+detections = model.detect(img)
 
-# Ambil hasil deteksi (bounding boxes)
-for result in results:  # 'results' adalah list, jadi kita iterasi
-    boxes = result.boxes  # Bounding boxes
-    for box in boxes:
-        x1, y1, x2, y2 = map(int, box.xyxy[0])  # Ambil koordinat bounding box
-        conf = box.conf[0]  # Confidence score
-        cls = int(box.cls[0])  # Kelas objek
-
-        # Gambar kotak di sekitar objek yang terdeteksi
-        if conf > 0.5:  # Jika confidence > 0.5
-            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Gambar kotak hijau
-            cv2.putText(img, f'{model.names[cls]} {conf:.2f}', (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+# Gambar kotak di sekitar objek yang terdeteksi (confidence > 0.5 sudah difilter backend)
+h, w = img.shape[:2]
+for (x1, y1, x2, y2), label in zip(detections.pixels(w, h).astype(int), detections.labels(model.names)):
+    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Gambar kotak hijau
+    cv2.putText(img, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
 # Tampilkan gambar dengan OpenCV
 cv2.imshow('Detection Result', img)
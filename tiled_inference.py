@@ -0,0 +1,150 @@
+"""
+Tiled inference for small, distant animals.
+
+At survey altitude an animal is a few pixels tall once the frame is
+scaled down to 300x300 or YOLO's 640, and the whole-frame pass misses it.
+TiledDetector cuts the full-resolution frame into overlapping tiles of
+about the model's input size, runs them as one batch (or spread over a
+few backend instances in threads), maps the boxes back to the frame and
+merges animals seen by more than one tile with vectorised NMS.
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from detections import Detections, fast_nms
+
+
+def tile_windows(width, height, tile=320, overlap=0.2):
+    """(N, 4) integer pixel windows of tile x tile squares covering the frame, neighbours overlapping by `overlap`"""
+    def starts(length):
+        size = min(tile, length)
+        if length <= size:
+            return np.zeros(1)
+        count = math.ceil((length - size) / (size * (1 - overlap))) + 1
+        return np.linspace(0, length - size, count)
+
+    x, y = np.meshgrid(starts(width), starts(height))
+    corner = np.column_stack([x.ravel(), y.ravel()])
+    return np.round(np.column_stack([corner, corner + [min(tile, width), min(tile, height)]])).astype(np.int32)
+
+
+def contained(boxes, scores, classes, threshold=0.8):
+    """
+    Mask of boxes lying mostly (`threshold` of their area) inside a bigger box of the
+    same class that scores at least as high: the cut-off part of an animal a tile
+    border runs through, which plain IoU NMS keeps because it only overlaps a
+    fraction of the whole animal.
+    """
+    top_left = np.maximum(boxes[:, np.newaxis, :2], boxes[np.newaxis, :, :2])
+    bottom_right = np.minimum(boxes[:, np.newaxis, 2:], boxes[np.newaxis, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area = np.maximum(np.prod(boxes[:, 2:] - boxes[:, :2], axis=1), 1e-9)
+    inside = intersection / area[:, np.newaxis] > threshold
+    inside &= (scores[np.newaxis, :] >= scores[:, np.newaxis]) & (area[np.newaxis, :] > area[:, np.newaxis])
+    inside &= classes[:, np.newaxis] == classes[np.newaxis, :]
+    return inside.any(axis=1)
+
+
+class TiledDetector:
+    """
+
+    Detect on overlapping tiles of the full-resolution frame.
+
+           detect(image)   full resolution image in the backend's order -> Detections
+           report()        tiles per frame and the cost per frame and per tile
+
+    `tile` is the tile side in pixels and `overlap` the fraction neighbouring
+    tiles share, so an animal cut by one tile's border is whole in the next.
+    `full_frame` adds the usual whole-frame pass for animals bigger than a tile.
+    With several `backends` (independent instances of the same model) the tiles
+    are split between them and run in parallel threads; with one they go
+    through it as a single batch.
+
+    """
+
+    def __init__(self, backend, tile=320, overlap=0.2, full_frame=True, nms_iou=0.5, backends=None):
+        self.backends = backends or [backend]
+        self.backend = self.backends[0]
+        self.tile = tile
+        self.overlap = overlap
+        self.full_frame = full_frame
+        self.nms_iou = nms_iou
+        self.executor = ThreadPoolExecutor(len(self.backends)) if len(self.backends) > 1 else None
+
+        self.windows = None
+        self.shape = None
+
+        self.last_time = 0.0
+        self.frames = 0
+        self.tiles = 0
+        self.total_time = 0.0
+
+    @property
+    def order(self):
+        return self.backend.order
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    def run(self, images):
+        """Detections for a list of images, split between the backends"""
+        if self.executor is None:
+            return self.backend.infer(images)
+
+        chunk = math.ceil(len(images) / len(self.backends))
+        jobs = [self.executor.submit(backend.infer, images[i:i + chunk])
+                for backend, i in zip(self.backends, range(0, len(images), chunk))]
+        results = []
+        for i, job in enumerate(jobs):
+            detections = job.result()
+            detections.image += i * chunk  # Back to indices into `images`
+            results.append(detections)
+        return Detections.concat(results)
+
+    def detect(self, image):
+        started = time.perf_counter()
+        height, width = image.shape[:2]
+        if self.shape != (height, width):
+            self.shape = (height, width)
+            self.windows = tile_windows(width, height, self.tile, self.overlap)
+        windows = self.windows
+
+        images = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in windows.tolist()]
+        if self.full_frame and len(windows) > 1:
+            images.append(image)
+            windows = np.vstack([windows, [[0, 0, width, height]]])
+        found = self.run(images)
+
+        # Tile-normalised boxes -> frame-normalised boxes
+        window = windows[found.image].astype(np.float32)
+        extent = window[:, 2:] - window[:, :2]
+        boxes = found.boxes * np.tile(extent, 2) + np.tile(window[:, :2], 2)
+        boxes /= np.array([width, height, width, height], np.float32)
+        detections = Detections(boxes, found.scores, found.classes)
+
+        if len(detections) > 1:
+            detections = detections.select(fast_nms(detections.boxes, detections.scores, self.nms_iou,
+                                                    detections.classes))
+            detections = detections.select(~contained(detections.boxes, detections.scores, detections.classes))
+
+        self.last_time = time.perf_counter() - started
+        self.total_time += self.last_time
+        self.frames += 1
+        self.tiles += len(images)
+        return detections
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def report(self):
+        frames = max(self.frames, 1)
+        tiles = self.tiles / frames
+        per_frame = self.total_time / frames
+        return (f"Tiled ({self.tile} px, {self.overlap:.0%} overlap): {tiles:.0f} tiles per frame, "
+                f"{per_frame * 1000:.1f} ms per frame, {per_frame / max(tiles, 1) * 1000:.1f} ms per tile")
@@ -0,0 +1,114 @@
+"""
+Render numpy frames into a Tk label without reallocating images every frame.
+
+Creating a PIL.Image and an ImageTk.PhotoImage per frame churns large Tk
+image objects. TkRenderer keeps one PIL image and one PhotoImage per frame
+size and copies each new frame's pixels into them in place.
+"""
+
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class TkRenderer:
+    """
+
+    Show RGB uint8 frames in a Tk label.
+
+           show(frame)     draw now, must be called on the Tk main thread
+           submit(frame)   hand over a frame from any thread, the newest one is
+                           drawn by a polling loop on the Tk main thread and
+                           frames that arrive while Tk is behind are skipped
+
+    When a StartupTimer is given, "first_render" is marked and the startup
+    report printed after the first frame is shown.
+
+    """
+
+    def __init__(self, label, poll_interval=5, timer=None):
+        self.label = label
+        self.timer = timer
+        self.poll_interval = poll_interval  # ms between checks for a submitted frame
+
+        # {(width, height): (PIL image, PhotoImage)}
+        self.images = {}
+        self.current_size = None
+
+        # Slot for frames handed over by submit()
+        self.lock = threading.Lock()
+        self.pending = None
+
+        self.rendered = 0
+        self.skipped = 0
+        self.last_time = 0.0
+        self.total_time = 0.0
+        self.running = False
+
+    def image_for(self, width, height):
+        size = (width, height)
+        if size not in self.images:
+            image = Image.new("RGB", size)
+            self.images[size] = (image, ImageTk.PhotoImage(image=image))
+        return self.images[size]
+
+    def show(self, frame):
+        """Copy an RGB frame into the PhotoImage for its size and display it"""
+        started = time.perf_counter()
+
+        height, width = frame.shape[:2]
+        image, photo = self.image_for(width, height)
+
+        # Decode the raw pixels into the existing PIL image, then into the existing PhotoImage
+        image.frombytes(np.ascontiguousarray(frame).data)
+        photo.paste(image)
+
+        # Only touch the label when the size (and so the PhotoImage) changes
+        if self.current_size != (width, height):
+            self.current_size = (width, height)
+            self.label.imgtk = photo  # Keep a reference to avoid garbage collection
+            self.label.configure(image=photo)
+
+        self.last_time = time.perf_counter() - started
+        self.total_time += self.last_time
+        self.rendered += 1
+        if self.timer and self.timer.mark("first_render"):
+            print(self.timer.report())
+
+    def submit(self, frame):
+        """Queue a frame from any thread, replacing one that has not been drawn yet"""
+        with self.lock:
+            if self.pending is not None:
+                self.skipped += 1
+            self.pending = frame
+
+    def start(self):
+        """Start drawing submitted frames on the Tk main loop"""
+        self.running = True
+        self.poll()
+
+    def stop(self):
+        self.running = False
+
+    def poll(self):
+        if not self.running:
+            return
+
+        with self.lock:
+            frame = self.pending
+            self.pending = None
+
+        if frame is not None:
+            try:
+                self.show(frame)
+            except Exception as e:
+                print(f"Error while rendering video: {e}")
+
+        self.label.after(self.poll_interval, self.poll)
+
+    def report(self):
+        mean = self.total_time / self.rendered if self.rendered else 0.0
+        return (f"{self.rendered} frames rendered, {self.skipped} skipped, "
+                f"{mean * 1000:.2f} ms mean, last {self.last_time * 1000:.2f} ms")
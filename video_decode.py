@@ -0,0 +1,256 @@
+"""
+Decode path for the Tello H.264 stream opened with PyAV.
+
+The old path asked PyAV for bgr24, then converted to RGB with OpenCV: an extra
+full-frame conversion and array per frame. FrameDecoder asks swscale for the
+target pixel format directly. PyAV's reformatter always returns a new FFmpeg
+frame, so its pixels are copied into a numpy buffer from a FramePool; consumers
+that release() the buffer when done let the next frame reuse it.
+
+MultiResolutionDecoder and StreamDecoderPump go one step further and have
+swscale produce every size a consumer needs (display, detector input) from
+the decoded YUV frame, so nothing downstream resizes full-resolution pixels.
+
+open_stream() opens the Tello UDP stream with one of the DECODER_MODES, trading
+decode throughput against added latency. With fast_start it also skips most of
+FFmpeg's stream probing, and decode_frames() waits for the first keyframe
+explicitly instead.
+"""
+
+import threading
+import time
+
+import av
+import numpy as np
+from av.video.reformatter import VideoReformatter
+
+from color_frame import ColorFrame
+from frame_mailbox import FrameMailbox
+from frame_pool import FramePool
+
+
+# Decoder settings for the Tello H.264 stream, see bench_decoder_modes.py for numbers
+DECODER_MODES = {
+    # FFmpeg defaults: single threaded, normal demuxer buffering
+    "default": {},
+    # Slice threading uses every core on a frame without holding frames back
+    "slice": {
+        "thread_type": "SLICE",
+    },
+    # Frame threading has the highest throughput, but every extra thread adds a frame of delay
+    "frame": {
+        "thread_type": "FRAME",
+    },
+    # Slice threading plus low-delay flags: output each frame as soon as it is decoded
+    # (no B-frame reorder wait) and do not buffer packets in the demuxer
+    "low_delay": {
+        "thread_type": "SLICE",
+        "codec_options": {"flags": "+low_delay", "flags2": "+fast"},
+        "container_options": {"fflags": "nobuffer"},
+    },
+}
+
+# Container options for a fast start. The Tello always sends raw H.264, so the
+# format is forced and FFmpeg only reads a few packets before returning. The
+# SPS/PPS and IDR frame are waited for by decode_frames() instead.
+FAST_START_OPTIONS = {
+    "probesize": "32768",     # bytes
+    "analyzeduration": "0",   # microseconds
+}
+
+
+def configure_decoder(codec_context, mode="low_delay", threads=0):
+    """Apply a DECODER_MODES entry to a codec context that has not been opened yet"""
+    settings = DECODER_MODES[mode]
+    if "thread_type" in settings:
+        codec_context.thread_type = settings["thread_type"]
+        codec_context.thread_count = threads  # 0 lets FFmpeg pick one thread per core
+    if "codec_options" in settings:
+        codec_context.options = dict(settings["codec_options"])
+    return codec_context
+
+
+def open_stream(address, mode="low_delay", threads=0, fast_start=True, timer=None):
+    """
+
+    Open a video stream with the given decoder mode.
+
+    Returns the PyAV container, its first video stream is configured and ready
+    for decode_frames(container). When a StartupTimer is given, "open" is marked
+    once av.open returns.
+
+    """
+    if mode not in DECODER_MODES:
+        raise ValueError(f"Unknown decoder mode: {mode}")
+
+    options = dict(DECODER_MODES[mode].get("container_options", {}))
+    if fast_start:
+        options.update(FAST_START_OPTIONS)
+
+    container = av.open(address, format="h264" if fast_start else None, options=options)
+    configure_decoder(container.streams.video[0].codec_context, mode, threads)
+    if timer:
+        timer.mark("open")
+    return container
+
+
+def decode_frames(container, timer=None, wait_keyframe=True):
+    """
+
+    Decode the first video stream of a container, yielding av.VideoFrame objects.
+
+    Packets before the first keyframe are dropped, since the decoder cannot produce
+    a clean picture until it has the SPS/PPS and an IDR frame. When a StartupTimer
+    is given, "first_packet", "first_keyframe" and "first_frame" are marked.
+
+    """
+    for packet in container.demux(video=0):
+        # The empty packet demux yields at the end of a stream flushes the frames the
+        # decoder still holds (B-frame reordering, frame threads), so it is decoded too
+        if packet.size:
+            if timer:
+                timer.mark("first_packet")
+
+            if wait_keyframe:
+                if not packet.is_keyframe:
+                    continue
+                wait_keyframe = False
+                if timer:
+                    timer.mark("first_keyframe")
+        elif wait_keyframe:
+            continue
+
+        for frame in packet.decode():
+            if timer:
+                timer.mark("first_frame")
+            yield frame
+
+
+class FrameDecoder:
+    """
+
+    Convert decoded av.VideoFrame objects into numpy images.
+
+           format      pixel format to ask swscale for ("rgb24", "bgr24", "gray", ...)
+           width       output width, None to keep the stream width
+           height      output height, None to keep the stream height
+
+    convert() returns a read-only view of a buffer borrowed from a FramePool. The
+    caller owns it until it passes the image to release(); after that the buffer
+    may be overwritten by the next frame. Images that are never released are
+    simply left to the garbage collector, so keeping a frame is always safe.
+
+    """
+
+    def __init__(self, format="rgb24", width=None, height=None):
+        self.format = format
+        self.width = width
+        self.height = height
+
+        # The reformatter keeps its swscale context between calls
+        self.reformatter = VideoReformatter()
+        self.pool = FramePool()
+
+    def convert(self, frame, writable=False):
+        """Convert a decoded frame into a pooled buffer, release() it when done"""
+        out = self.reformatter.reformat(frame, width=self.width, height=self.height, format=self.format)
+
+        # Only packed formats are supported, so everything is in the first plane
+        plane = out.planes[0]
+        channels = len(out.format.components)
+        shape = (out.height, out.width, channels) if channels > 1 else (out.height, out.width)
+
+        # swscale rows may be padded, view them without the padding
+        rows = np.frombuffer(plane, np.uint8).reshape(out.height, plane.line_size)
+        pixels = rows[:, :out.width * channels].reshape(shape)
+
+        buffer = self.pool.borrow(shape)
+        np.copyto(buffer, pixels)
+
+        view = buffer.view()
+        view.flags.writeable = writable
+        return view
+
+    def release(self, image):
+        """Hand an image returned by convert() back, the caller must not use it afterwards"""
+        self.pool.release(image.base if image.base is not None else image)
+
+
+class MultiResolutionDecoder:
+    """
+
+    Produce several scaled images from every decoded frame.
+
+           outputs     {name: (format, width, height)}, e.g.
+                       {"display": ("rgb24", 720, 480), "detector": ("rgb24", 300, 300)}
+
+    Each output is scaled by swscale straight from the decoded YUV planes, so the
+    detector input never exists at full resolution in RGB. Outputs are ColorFrames
+    tagged with the channel order of their pixel format. Pass the dict back to
+    release() once every output is no longer needed.
+
+    """
+
+    def __init__(self, outputs):
+        self.decoders = {name: FrameDecoder(*spec) for name, spec in outputs.items()}
+
+    def convert(self, frame, writable=False):
+        """Return {name: ColorFrame} for a decoded frame"""
+        return {name: ColorFrame.from_format(decoder.convert(frame, writable), decoder.format)
+                for name, decoder in self.decoders.items()}
+
+    def release(self, frames):
+        """Give the buffers of a convert() result back to their decoders"""
+        for name, frame in frames.items():
+            self.decoders[name].release(frame.pixels)
+
+
+class StreamDecoderPump:
+    """
+
+    Capture worker that decodes a PyAV container into a FrameMailbox.
+
+    Every published mailbox item is the {name: ColorFrame} dict produced by a
+    MultiResolutionDecoder for `outputs`. The container is owned by the caller,
+    which should close it after stop().
+
+    A single consumer that takes every frame it uses out of the mailbox can call
+    release(frames) when done, so later frames reuse those buffers. With several
+    consumers nobody knows when a frame is free, so they just do not release.
+
+    """
+
+    def __init__(self, container, outputs, timer=None):
+        self.container = container
+        self.timer = timer
+        self.decoder = MultiResolutionDecoder(outputs)
+        self.frames = FrameMailbox()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.frames.close()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def run(self):
+        try:
+            for frame in decode_frames(self.container, self.timer):
+                if not self.running:
+                    break
+                timestamp = time.perf_counter()
+                self.frames.put(self.decoder.convert(frame), timestamp)
+        except Exception as e:
+            if self.running:
+                print(f"Error while decoding video: {e}")
+
+    def release(self, frames):
+        """Give a published {name: ColorFrame} dict back once the consumer is done with it"""
+        self.decoder.release(frames)
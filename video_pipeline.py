@@ -0,0 +1,282 @@
+"""
+Capture -> inference -> render pipeline for the Tello video feed.
+
+The three stages run independently so a slow detector never stalls the
+video label or the control inputs:
+
+    capture   worker thread, publishes new frames into a FrameMailbox
+    inference worker thread, runs the detector as fast as it can
+    render    Tk main loop (Tk is not thread safe), draws at stream rate
+
+The capture stage takes every new frame from the capture's latest-frame
+mailbox, at most `capture_fps` times a second, and hands it to each
+consumer through a StageQueue with that stage's own drop policy. The
+default, LATEST, is a mailbox of its own: the consumer only ever sees the
+newest frame, never the same frame twice, and frames it could not keep up
+with are skipped. DROP_OLDEST, DROP_NEWEST and BLOCK keep a bounded queue
+instead. Skipped and dropped frames are counted per stage.
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+
+from frame_mailbox import FrameMailbox
+
+
+# Drop policies for a StageQueue
+LATEST = "latest"       # Single-slot mailbox, a new frame replaces an untaken one
+DROP_OLDEST = "oldest"  # Throw away the oldest queued item and keep the new one
+DROP_NEWEST = "newest"  # Keep the queued items and throw away the new one
+BLOCK = "block"         # Wait until the consumer makes room
+
+
+class StageQueue:
+    """Bounded hand-over between two stages with a fixed drop policy"""
+
+    def __init__(self, maxsize=1, policy=LATEST):
+        if policy not in (LATEST, DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.policy = policy
+        self.mailbox = FrameMailbox() if policy == LATEST else None
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.put_count = 0
+        self.dropped = 0
+
+    @property
+    def drop_count(self):
+        return self.mailbox.overwritten if self.mailbox is not None else self.dropped
+
+    def put(self, item, timeout=None):
+        """Hand an item to the next stage, applying the drop policy when full"""
+        self.put_count += 1
+
+        if self.mailbox is not None:
+            self.mailbox.put(item)
+            return
+
+        if self.policy == BLOCK:
+            try:
+                self.queue.put(item, timeout=timeout)
+            except queue.Full:
+                self.dropped += 1
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Take the next item, or None when nothing arrives before the timeout (0 = do not wait)"""
+        if self.mailbox is not None:
+            taken = self.mailbox.take(timeout)
+            return taken[2] if taken is not None else None
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self.mailbox is not None:
+            self.mailbox.close()
+
+    def __str__(self):
+        return f"{self.policy}, {self.drop_count} dropped"
+
+
+class StageStats:
+    """Frame counter and rate for a single stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.skipped = 0
+        self.last_time = 0.0
+        self.busy_time = 0.0
+        self.start_time = time.perf_counter()
+
+    def record(self, duration):
+        self.count += 1
+        self.busy_time += duration
+        self.last_time = duration
+
+    def skip(self, count):
+        self.skipped += count
+
+    def fps(self):
+        elapsed = time.perf_counter() - self.start_time
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.count} frames, {self.skipped} skipped, {self.fps():.1f} fps, "
+                f"last {self.last_time * 1000:.1f} ms")
+
+
+class VideoPipeline:
+    """
+
+    Run the capture, inference and render stages of a video feed.
+
+           capture                  -> start(), stop() and a `frames` FrameMailbox
+           detect(frame)            -> detection result     (inference worker)
+           draw(frame, result)      -> image to display     (Tk main loop)
+           show(image)              -> put image on screen  (Tk main loop)
+
+    Rates are in frames per second, None means "as fast as possible".
+    `inference_policy` and `render_policy` are the drop policies of the
+    stages' input queues (LATEST, DROP_OLDEST, DROP_NEWEST or BLOCK), with
+    `queue_size` slots for the queued policies.
+    The render stage always draws the most recent detection result on top of
+    the most recent frame, so overlays stay live even when the detector is
+    several frames behind.
+
+    """
+
+    def __init__(self, root, capture, detect, draw, show, inference_fps=None, render_fps=30, timer=None,
+                 capture_fps=None, inference_policy=LATEST, render_policy=LATEST, queue_size=1):
+        self.root = root
+        self.capture = capture
+        self.frames = capture.frames
+        self.detect = detect
+        self.draw = draw
+        self.show = show
+
+        self.capture_fps = capture_fps
+        self.inference_fps = inference_fps
+        self.render_fps = render_fps
+
+        # Each consumer gets (seq, timestamp, frame) through its own queue and policy
+        self.inference_queue = StageQueue(queue_size, inference_policy)
+        self.render_queue = StageQueue(queue_size, render_policy)
+
+        # Most recent detection result, shared with the render stage
+        self.result_lock = threading.Lock()
+        self.latest_result = None
+        self.result_seq = 0
+
+        self.capture_stats = StageStats()
+        self.inference_stats = StageStats()
+        self.render_stats = StageStats()
+        self.rendered_seq = 0
+
+        # Optional StartupTimer, the startup breakdown is printed once the first frame is shown
+        self.timer = timer
+
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        """Start the capture and inference workers and the render loop"""
+        self.running = True
+        self.capture.start()
+        for target in (self.capture_loop, self.inference_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.render_loop()
+
+    def stop(self):
+        """Stop all stages and wait briefly for the workers to exit"""
+        self.running = False
+        self.capture.stop()
+        self.inference_queue.close()
+        self.render_queue.close()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.threads = []
+
+    def get_result(self):
+        with self.result_lock:
+            return self.latest_result
+
+    def capture_loop(self):
+        seq = 0
+        while self.running:
+            latest = self.frames.wait_newer(seq, timeout=0.1)
+            if latest is None:
+                continue
+            started = time.perf_counter()
+            self.capture_stats.skip(latest[0] - seq - 1 if seq else 0)
+            seq = latest[0]
+            self.inference_queue.put(latest, timeout=0.1)
+            self.render_queue.put(latest, timeout=0.1)
+            self.capture_stats.record(time.perf_counter() - started)
+            pace(started, self.capture_fps)
+
+    def inference_loop(self):
+        seq = 0
+        while self.running:
+            latest = self.inference_queue.get(timeout=0.1)
+            if latest is None:
+                continue
+            self.inference_stats.skip(latest[0] - seq - 1 if seq else 0)
+            seq, _, frame = latest
+
+            started = time.perf_counter()
+            try:
+                result = self.detect(frame)
+                with self.result_lock:
+                    self.latest_result = result
+                    self.result_seq = seq
+                self.inference_stats.record(time.perf_counter() - started)
+            except Exception as e:
+                print(f"Error in inference stage: {e}")
+            pace(started, self.inference_fps)
+
+    def render_loop(self):
+        if not self.running:
+            return
+
+        started = time.perf_counter()
+        try:
+            latest = self.render_queue.get(timeout=0)
+            if latest is not None:
+                seq, _, frame = latest
+                self.render_stats.skip(seq - self.rendered_seq - 1 if self.rendered_seq else 0)
+                self.rendered_seq = seq
+                self.show(self.draw(frame, self.get_result()))
+                self.render_stats.record(time.perf_counter() - started)
+                if self.timer and self.timer.mark("first_render"):
+                    print(self.timer.report())
+        except Exception as e:
+            print(f"Error in render stage: {e}")
+
+        # Schedule the next frame, taking the time spent drawing into account
+        period = 1.0 / self.render_fps if self.render_fps else 0.0
+        delay = max(1, int((period - (time.perf_counter() - started)) * 1000))
+        self.root.after(delay, self.render_loop)
+
+    def report(self):
+        return (f"capture: {self.frames}, {self.capture_stats}\n"
+                f"inference: {self.inference_stats} ({self.inference_queue})\n"
+                f"render: {self.render_stats} ({self.render_queue})")
+
+
+def pace(started, fps):
+    """Sleep for whatever is left of the frame period that began at `started`"""
+    if not fps:
+        return
+    remaining = 1.0 / fps - (time.perf_counter() - started)
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def draw_boxes(frame, boxes, labels=None, color=(0, 255, 0)):
+    """Draw (x1, y1, x2, y2) boxes and optional labels onto a frame in place"""
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+        if labels is not None:
+            cv2.putText(frame, labels[i], (int(x1), int(y1) - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return frame
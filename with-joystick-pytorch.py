@@ -2,22 +2,30 @@
 from tkinter import Tk, Label, Button, Frame
 # Import OpenCV for receiving the video frames
 import cv2
-# Import Pillow for displaying the video stream with Tkinter.
-from PIL import Image, ImageTk
+# Import the renderer that reuses one PhotoImage for the video label
+from tk_render import TkRenderer
 # Import the djitellopy module for controlling the Tello drone
 from djitellopy import tello
 # Import threading for takeoff/land methods
 import threading
 # Import flight commands
 from flight_commands import start_flying, stop_flying
-from ultralytics import YOLO
+# Import the capture -> inference -> render pipeline for the video label
+from video_pipeline import VideoPipeline, draw_boxes
+from color_frame import BGR, TELLO_FRAME_SHAPE
+from frame_mailbox import FrameReadPump
+from startup_timer import StartupTimer
+# Import the detector that runs YOLO in its own process
+from detector_process import DetectorProcess
+from detector_backend import create_backend
+from model_cache import ModelCache
+# import the gate that skips YOLO on unchanged frames
+from motion_gate import MotionGate
+from functools import partial
 import av
 import numpy as np
 import pygame
 
-# Initialize the YOLO model
-model = YOLO('best.pt')
-
 # Class for controlling the drone via keyboard and joystick commands
 class DroneController:
     def __init__(self):
@@ -29,19 +37,35 @@ class DroneController:
         # Create a hidden frame to handle input from key presses and releases
         self.input_frame = Frame(self.root)
 
+        # Time every startup step until the first frame is on screen
+        self.timer = StartupTimer()
+
+        # Run YOLO in a separate process, frames are exchanged through shared memory. The worker
+        # starts now, so best.pt loads and warms up while the drone connects
+        self.detector = DetectorProcess(partial(create_backend, 'yolo-stream', model_path='best.pt', threshold=0.5,
+                                                cache=ModelCache()))
+        self.detector.preload(TELLO_FRAME_SHAPE)
+
         # Initialize, connect, and turn on the drone's video stream
         self.drone = tello.Tello()
         self.drone.connect()
+        self.timer.mark("connect")
         self.drone.streamon()
+        self.timer.mark("streamon")
         self.frame = self.drone.get_frame_read()
 
         # Define a speed for the drone to fly at
         self.drone.speed = 25
 
-        self.animal_model = YOLO('best.pt')
+        # Reuse the last detections while the picture does not change, e.g. when hovering
+        self.gate = MotionGate(self.detector, order=BGR)
 
         # Label for displaying the video stream
         self.cap_lbl = Label(self.root)
+        self.renderer = TkRenderer(self.cap_lbl)
+
+        # Video pipeline, started by video_stream()
+        self.pipeline = None
 
         # Create a button for takeoff/land commands
         self.takeoff_land_button = Button(self.root, text="Takeoff/Land", command=lambda: self.takeoff_land())
@@ -136,6 +160,9 @@ class DroneController:
             # Start the video stream
             self.video_stream()
 
+            # Poll the joystick on its own schedule, independent of the video
+            self.joystick_loop()
+
             # Start the Tkinter main loop
             self.root.mainloop()
 
@@ -144,32 +171,50 @@ class DroneController:
         finally:
             self.cleanup()
 
+    def joystick_loop(self):
+        # Update joystick controls every 100ms
+        self.joystick_control()
+        self.root.after(100, self.joystick_loop)
+
     def video_stream(self):
         try:
-            h = 480
-            w = 720
+            # Capture, YOLO inference and drawing run as separate stages so a slow
+            # prediction does not hold up the window or the joystick
+            self.pipeline = VideoPipeline(self.root, FrameReadPump(self.frame, timer=self.timer), self.detect_animals,
+                                          self.draw_frame, self.show_frame, timer=self.timer)
+            self.pipeline.start()
 
-            frame = self.frame.frame
-
-            results = self.animal_model.predict(frame, conf=0.5)
-            annotated_frame = results[0].plot()
-
-            img = Image.fromarray(annotated_frame)
-            imgtk = ImageTk.PhotoImage(image=img)
+        except Exception as e:
+            print(f"Error in video_stream: {e}")
 
-            self.cap_lbl.imgtk = imgtk
-            self.cap_lbl.configure(image=imgtk)
+    def detect_animals(self, frame):
+        # Ultralytics expects BGR arrays and flips them back to RGB itself, so only hand it a reversed view
+        detections = self.gate.detect(frame.view(BGR))
 
-            self.cap_lbl.after(10, self.video_stream)
+        # Keep only boxes and labels, drawing happens in the render stage
+        labels = detections.labels(self.detector.names)
+        return detections.pixels(frame.shape[1], frame.shape[0]), labels
 
-            # Update joystick controls every 100ms
-            self.joystick_control()
+    def draw_frame(self, frame, result):
+        # Draw the most recent detections on top of the most recent frame
+        annotated_frame = frame.rgb.copy()
+        if result is not None:
+            draw_boxes(annotated_frame, *result)
+        return annotated_frame
 
-        except Exception as e:
-            print(f"Error in video_stream: {e}")
+    def show_frame(self, annotated_frame):
+        # Copy the pixels into the label's PhotoImage in place
+        self.renderer.show(annotated_frame)
 
     def cleanup(self) -> None:
         try:
+            if self.pipeline:
+                self.pipeline.stop()  # Stop the video pipeline workers
+                print(self.pipeline.report())
+                print(f"Render: {self.renderer.report()}")
+            self.detector.stop()  # Stop the detector process
+            print(f"Detector: {self.detector.report()}")
+            print(self.gate.report())
             self.drone.end()  # Terminate drone connection
             self.root.quit()  # Quit the Tkinter main loop
             self.root.destroy()  # Destroy the Tkinter root window
@@ -1,20 +1,38 @@
 # import Tkinter to create our GUI.
 from tkinter import Tk, Label, Button, Frame
-# import openCV for receiving the video frames
-import cv2
 # make imports from the Pillow library for displaying the video stream with Tkinter.
-from PIL import Image, ImageTk
+# import the renderer that reuses one PhotoImage for the video label
+from tk_render import TkRenderer
 # Import the tello module
 from djitellopy import tello
 # Import threading for our takeoff/land method
 import threading
 # import our flight commands
 from flight_commands import start_flying, stop_flying
+# import the capture -> inference -> render pipeline for the video label
+from video_pipeline import VideoPipeline, draw_boxes
+# import the decoder that scales frames for the display and the detector
+from video_decode import StreamDecoderPump, open_stream
+from startup_timer import StartupTimer
+# import the buffer pool for the per-frame arrays
+from frame_pool import FramePool
+# import the process-wide detector registry
+from model_registry import registry
+from model_cache import ModelCache
+# import the detect-every-N-frames scheduler
+from detection_scheduler import DetectionScheduler
 
 import av
-import numpy as np
 import pygame
 
+# The TensorFlow model for face recognition through cv2.dnn
+FACE_MODEL = dict(
+    model_path='frozen_inference_graph.pb',
+    config_path='ssd_mobilenet_v1_coco_2017_11_17.pbtxt',  # Path to configuration file
+    threshold=0.5,  # You can adjust this threshold
+    cache=ModelCache()  # Keeps the prepared config between launches
+)
+
 # Class for controlling the drone via keyboard commands
 class DroneController:
     def __init__(self):
@@ -40,12 +58,22 @@ class DroneController:
             self.joystick = None
             print("No joystick detected!")
 
+        # Time every startup step until the first frame is on screen
+        self.timer = StartupTimer()
+
+        # Load the detector in the background while the drone connects
+        registry.preload('dnn', **FACE_MODEL)
+
         # Initialize, connect, and turn on the drones video stream
         self.drone = tello.Tello()
         self.drone.connect()
+        self.timer.mark("connect")
         self.drone.streamon()
-        # Initialize a variable to get the video frames from the drone
-        self.frame = self.drone.get_frame_read()
+        self.timer.mark("streamon")
+        # Open the video stream ourselves so the decoder can emit the display-size and
+        # detector-size images directly, instead of resizing full frames in Python
+        # (decoder modes: "default", "slice", "frame" or "low_delay")
+        self.container = open_stream(self.drone.get_udp_video_address(), mode="low_delay", timer=self.timer)
 
         # Define a speed for the drone to fly at
         self.drone.speed = 25
@@ -55,12 +83,21 @@ class DroneController:
 
         # Label for displaying video stream
         self.cap_lbl = Label(self.root)
+        self.renderer = TkRenderer(self.cap_lbl)
+
+        # Buffers for the per-frame overlay and model input, reused from frame to frame
+        self.pool = FramePool()
+
+        # Video pipeline, started by video_stream()
+        self.pipeline = None
         
-        # Load the TensorFlow model for face recognition
-        self.face_net = cv2.dnn.readNetFromTensorflow(
-            'frozen_inference_graph.pb',
-            'ssd_mobilenet_v1_coco_2017_11_17.pbtxt'  # Path to configuration file
-        )
+        # The TensorFlow model for face recognition through cv2.dnn, loaded and warmed up once
+        self.face_net = registry.get('dnn', **FACE_MODEL)
+        self.timer.mark("model")
+        print(registry.report())
+
+        # Run the detector every few frames only, optical flow moves the boxes in between
+        self.scheduler = DetectionScheduler(self.face_net)
 
         # Create a button to send takeoff and land commands to the drone
         self.takeoff_land_button = Button(self.root, text="Takeoff/Land", command=lambda: self.takeoff_land())
@@ -224,74 +261,44 @@ class DroneController:
 
     def video_stream(self):
         try:
-            # Define the height and width to resize the current frame to
-            h = 480
-            w = 720
-
-            # Read a frame from the drone
-            frame = self.frame.frame
-
-            # Check if the frame is valid
-            if frame is None:
-                print("No frame received")
-                return
-
-            # Resize the frame to fit the display window
-            frame_resized = cv2.resize(frame, (w, h))
-
-            # Convert the current frame to the RGB color space (OpenCV uses BGR)
-            cv2image = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-
-            # Perform face detection
-            faces = self.detect_faces(frame_resized)
-
-            # Draw bounding boxes on detected faces
-            for (x, y, x1, y1) in faces:
-                cv2.rectangle(cv2image, (x, y), (x1, y1), (0, 255, 0), 2)
-
-            # Convert this to a Pillow Image object
-            img = Image.fromarray(cv2image)
-
-            # Convert this then to a Tkinter compatible PhotoImage object
-            imgtk = ImageTk.PhotoImage(image=img)
-
-            # Set the image to the label and update it
-            self.cap_lbl.imgtk = imgtk  # Keep a reference to avoid garbage collection
-            self.cap_lbl.configure(image=imgtk)
-
-            # Schedule the next frame update
-            self.cap_lbl.after(10, self.video_stream)
+            # Define the height and width of the display and detector images
+            capture = StreamDecoderPump(self.container, {
+                "display": ("rgb24", 720, 480),
+                "detector": ("rgb24", 300, 300),
+            }, timer=self.timer)
+
+            # Capture, face detection and drawing run as separate stages so a slow
+            # forward pass does not hold up the window or the controls
+            self.pipeline = VideoPipeline(self.root, capture, self.detect_faces,
+                                          self.draw_frame, self.show_frame, timer=self.timer)
+            self.pipeline.start()
 
         except Exception as e:
             print(f"Error in video_stream: {e}")
 
-    def detect_faces(self, frame):
-        try:
-            # Prepare the frame for the model
-            blob = cv2.dnn.blobFromImage(frame, size=(300, 300), swapRB=True, crop=False)
-            self.face_net.setInput(blob)
-
-            # Perform forward pass to detect faces
-            detections = self.face_net.forward()
+    def draw_frame(self, frames, faces):
+        # The decoder already hands out RGB, copy it so the boxes do not end up in the shared frame
+        cv2image = self.pool.copy(frames["display"].rgb)
 
-            # List to store face bounding boxes
-            face_boxes = []
+        # Draw the most recent face detections on the frame, scaled to the display image
+        if faces is not None:
+            draw_boxes(cv2image, faces.pixels(cv2image.shape[1], cv2image.shape[0]))
 
-            # Loop over all detections
-            for i in range(detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
+        return cv2image
 
-                # Filter out weak detections by confidence threshold
-                if confidence > 0.5:  # You can adjust this threshold
-                    box = detections[0, 0, i, 3:7] * np.array([frame.shape[1], frame.shape[0], frame.shape[1], frame.shape[0]])
-                    (x, y, x1, y1) = box.astype("int")
-                    face_boxes.append((x, y, x1, y1))
+    def show_frame(self, cv2image):
+        # Copy the pixels into the label's PhotoImage in place
+        self.renderer.show(cv2image)
+        self.pool.release(cv2image)
 
-            return face_boxes
+    def detect_faces(self, frames):
+        try:
+            # The detector image is already 300x300 RGB, boxes come back normalised
+            return self.scheduler.detect(frames["detector"].rgb)
 
         except Exception as e:
             print(f"Error in detect_faces: {e}")
-            return []
+            return None
 
 
     # Method for cleaning up resources
@@ -299,6 +306,13 @@ class DroneController:
         try:
             # Release any resources
             print("Cleaning up resources...")
+            if self.pipeline:
+                self.pipeline.stop()  # Stop the video pipeline workers
+                print(self.pipeline.report())
+                print(f"Render: {self.renderer.report()}")
+                print(self.face_net.report())
+                print(self.scheduler.report())
+            self.container.close()  # Close the video stream
             self.drone.end()  # Terminate drone connection
             self.root.quit()  # Quit the Tkinter main loop
             self.root.destroy()  # Destroy the Tkinter root window
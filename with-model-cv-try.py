@@ -10,9 +10,14 @@ from djitellopy import tello
 import threading
 # import our flight commands
 from flight_commands import start_flying, stop_flying
+# import the buffer pool for the per-frame arrays
+from frame_pool import FramePool
+# import the common detector interface
+from detections import Detections
+from detector_backend import create_backend
+from model_cache import ModelCache
 
 import av
-import numpy as np
 
 
 # Class for controlling the drone via keyboard commands
@@ -39,12 +44,19 @@ class DroneController:
 
         # Label for displaying video stream
         self.cap_lbl = Label(self.root)
+
+        # Buffers for the resized frame, reused from frame to frame
+        self.pool = FramePool()
         
-        # Load the TensorFlow model for face recognition
-        self.face_net = cv2.dnn.readNetFromTensorflow(
-            'frozen_inference_graph.pb',
-            'face_detection_model.pbtxt'  # Path to configuration file
+        # Load the TensorFlow model for face recognition through cv2.dnn
+        self.face_net = create_backend(
+            'dnn',
+            model_path='frozen_inference_graph.pb',
+            config_path='face_detection_model.pbtxt',  # Path to configuration file
+            threshold=0.5,  # You can adjust this threshold
+            cache=ModelCache()  # Keeps the prepared config between launches
         )
+        self.face_net.warmup()
 
         # Create a button to send takeoff and land commands to the drone
         self.takeoff_land_button = Button(self.root, text="Takeoff/Land", command=lambda: self.takeoff_land())
@@ -176,21 +188,22 @@ class DroneController:
                 print("No frame received")
                 return
 
-            # Resize the frame to fit the display window
-            frame_resized = cv2.resize(frame, (w, h))
+            # Tkinter wants RGB, which is what djitellopy already delivers, so the frame is used as is
 
-            # Convert the current frame to the RGB color space (OpenCV uses BGR)
-            cv2image = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
+            # Resize the frame to fit the display window
+            frame_resized = cv2.resize(frame, (w, h), dst=self.pool.borrow((h, w, 3)))
+            cv2image = frame_resized
 
             # Perform face detection
             faces = self.detect_faces(frame_resized)
 
             # Draw bounding boxes on detected faces
-            for (x, y, x1, y1) in faces:
+            for (x, y, x1, y1) in faces.pixels(w, h).astype(int):
                 cv2.rectangle(cv2image, (x, y), (x1, y1), (0, 255, 0), 2)
 
-            # Convert this to a Pillow Image object
+            # Convert this to a Pillow Image object (this copies the pixels, so the buffers can go back)
             img = Image.fromarray(cv2image)
+            self.pool.release(frame_resized)
 
             # Convert this then to a Tkinter compatible PhotoImage object
             imgtk = ImageTk.PhotoImage(image=img)
@@ -207,31 +220,12 @@ class DroneController:
 
     def detect_faces(self, frame):
         try:
-            # Prepare the frame for the model
-            blob = cv2.dnn.blobFromImage(frame, size=(300, 300), swapRB=True, crop=False)
-            self.face_net.setInput(blob)
-
-            # Perform forward pass to detect faces
-            detections = self.face_net.forward()
-
-            # List to store face bounding boxes
-            face_boxes = []
-
-            # Loop over all detections
-            for i in range(detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
-
-                # Filter out weak detections by confidence threshold
-                if confidence > 0.5:  # You can adjust this threshold
-                    box = detections[0, 0, i, 3:7] * np.array([frame.shape[1], frame.shape[0], frame.shape[1], frame.shape[0]])
-                    (x, y, x1, y1) = box.astype("int")
-                    face_boxes.append((x, y, x1, y1))
-
-            return face_boxes
+            # The backend resizes into its own pooled 300x300 input, the frame is RGB already
+            return self.face_net.detect(frame)
 
         except Exception as e:
             print(f"Error in detect_faces: {e}")
-            return []
+            return Detections()
 
 
     # Method for cleaning up resources
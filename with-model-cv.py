@@ -1,82 +1,140 @@
 import cv2
 from djitellopy import Tello
-import tensorflow as tf
-import numpy as np
-
-
-def load_model():
-    # Muat model TensorFlow dan konfigurasi pbtxt
-    detection_graph = tf.Graph()
-    with detection_graph.as_default():
-        od_graph_def = tf.compat.v1.GraphDef()
-        # Muat frozen_inference_graph.pb
-        with tf.io.gfile.GFile("frozen_inference_graph.pb", "rb") as f:
-            serialized_graph = f.read()
-            od_graph_def.ParseFromString(serialized_graph)
-            tf.import_graph_def(od_graph_def, name="")
-
-    sess = tf.compat.v1.Session(graph=detection_graph)
-    input_tensor = detection_graph.get_tensor_by_name("image_tensor:0")
-    boxes = detection_graph.get_tensor_by_name("detection_boxes:0")
-    scores = detection_graph.get_tensor_by_name("detection_scores:0")
-    classes = detection_graph.get_tensor_by_name("detection_classes:0")
-    num_detections = detection_graph.get_tensor_by_name("num_detections:0")
-
-    return sess, detection_graph, input_tensor, boxes, scores, classes, num_detections
-
-
-def detect_objects(frame, sess, input_tensor, boxes, scores, classes, num_detections):
-    # Resize frame untuk model
-    resized_frame = cv2.resize(frame, (300, 300))
-    input_frame = np.expand_dims(resized_frame, axis=0)
-
-    # Inferensi menggunakan model
-    (det_boxes, det_scores, det_classes, det_num_detections) = sess.run(
-        [boxes, scores, classes, num_detections],
-        feed_dict={input_tensor: input_frame}
-    )
-
-    # Filter berdasarkan skor deteksi
+from video_decode import StreamDecoderPump, open_stream
+from color_frame import BGR
+from startup_timer import StartupTimer
+from frame_pool import FramePool
+from model_registry import registry
+from detections import PostProcessor, COCO_ANIMALS
+from model_cache import ModelCache
+from video_pipeline import draw_boxes
+from detection_scheduler import DetectionScheduler
+from sort_tracker import SortTracker
+from roi_inference import RoiDetector
+from tiled_inference import TiledDetector
+
+# Model deteksi (ganti "tf" dengan "dnn" untuk cv2.dnn, atau "tflite" tanpa TensorFlow penuh),
+# file model ikut berganti sesuai backend. Hanya kelas hewan, kotak yang saling tumpang tindih
+# dibuang dengan NMS
+BACKEND = "tf"
+MODEL_PATHS = {
+    "tf": "frozen_inference_graph.pb",
+    "dnn": "frozen_inference_graph.pb",
+    "tflite": "ssd_mobilenet_v1.tflite",  # Dibuat dengan export_tflite.py
+}
+DETECTOR = dict(model_path=MODEL_PATHS[BACKEND],
+                postprocess=PostProcessor(threshold=0.5, classes=COCO_ANIMALS, nms_iou=0.5), cache=ModelCache())
+
+# Detektor hanya dijalankan setiap N frame, kotak di antaranya diikuti dengan optical flow
+SCHEDULED = True
+
+# Setelah hewan ditemukan, hanya jendela di sekitar track yang diproses (resolusi penuh),
+# seluruh frame dipindai ulang secara berkala atau saat track hilang. Untuk model SSD 300x300
+# setiap jendela sama mahalnya dengan satu frame, jadi hanya resolusinya yang bertambah
+ROI = False
+
+# Untuk terbang tinggi: pemindaian penuh dilakukan per ubin 320 px yang saling tumpang tindih pada
+# frame resolusi penuh, supaya hewan yang kecil tetap terdeteksi (lebih lambat, sekitar 12 ubin per frame)
+TILED = False
+
+# Buffer bersama untuk frame per-iterasi, supaya tidak ada alokasi baru setiap frame
+pool = FramePool()
+
+# Setiap hewan mendapat ID tetap selama terlihat, untuk penghitungan
+tracker = SortTracker()
+
+
+def detect_objects(frame, detector, resized_frame=None):
+    # Inferensi menggunakan model (atau DetectionScheduler), input 300x300 diambil dari dekoder jika ada
+    detections, ids = tracker.update(detector.detect(frame if resized_frame is None else resized_frame))
+
+    # Kotak sudah difilter berdasarkan skor deteksi, gambar dalam koordinat frame dengan ID track
     h, w, _ = frame.shape
-    for i in range(int(det_num_detections[0])):
-        if det_scores[0][i] > 0.5:  # Ambang batas deteksi
-            box = det_boxes[0][i]
-            (ymin, xmin, ymax, xmax) = (box[0] * h, box[1] * w, box[2] * h, box[3] * w)
-            cv2.rectangle(frame, (int(xmin), int(ymin)), (int(xmax), int(ymax)), (0, 255, 0), 2)
+    draw_boxes(frame, detections.pixels(w, h), tracker.labels(detections, ids))
 
     return frame
 
 
-def process(tello, sess, input_tensor, boxes, scores, classes, num_detections):
+def process(tello, detector, timer=None):
+    # Dekoder langsung menghasilkan frame BGR untuk cv2.imshow dan input model 300x300 dalam urutan
+    # kanal backend, diambil lewat mailbox supaya frame yang sama tidak dideteksi dua kali
+    container = open_stream(tello.get_udp_video_address(), mode="low_delay", timer=timer)
+    pixel_format = "bgr24" if detector.order == BGR else "rgb24"
+    outputs = {
+        "display": ("bgr24", None, None),
+        "detector": (pixel_format, 300, 300),
+    }
+    # Mode ROI dan ubin butuh frame resolusi penuh dalam urutan kanal backend: frame display untuk
+    # backend BGR, atau output rgb24 tambahan dari dekoder, jadi tidak ada cvtColor resolusi penuh
+    source = "detector"
+    if ROI or TILED:
+        source = "display" if pixel_format == "bgr24" else "full"
+        outputs.setdefault(source, (pixel_format, None, None))
+    pump = StreamDecoderPump(container, outputs, timer=timer).start()
+    tiled = TiledDetector(detector, tile=320, overlap=0.2) if TILED else None
+    # Jendela ROI tetap lewat detektor biasa, hanya pemindaian penuh yang memakai ubin
+    roi = RoiDetector(tiled or detector, tracker, crop_backend=detector) if ROI else None
+    full = roi or tiled or detector
+    scheduler = DetectionScheduler(full) if SCHEDULED else full
+    seq = 0
     while True:
-        frame = tello.get_frame_read().frame
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Deteksi objek
-        frame_rgb = detect_objects(frame_rgb, sess, input_tensor, boxes, scores, classes, num_detections)
-
-        # Tampilkan frame
-        cv2.imshow("Frame", frame_rgb)
+        latest = pump.frames.wait_newer(seq, timeout=0.1)
+        if latest is not None:
+            seq, _, frames = latest
+            frame_bgr = pool.copy(frames["display"].bgr)
+
+            # Deteksi objek, mode ROI memotong jendela dari frame resolusi penuh
+            frame_bgr = detect_objects(frame_bgr, scheduler, frames[source].to(detector.order))
+
+            # Tampilkan frame
+            cv2.imshow("Frame", frame_bgr)
+            pool.release(frame_bgr)
+            # Loop ini satu-satunya konsumen, buffer dekoder boleh dipakai ulang frame berikutnya
+            pump.release(frames)
+            if timer and timer.mark("first_render"):
+                print(timer.report())
 
         # Tekan 'q' untuk keluar
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    pump.stop()
+    container.close()
+    print(f"Frames: {pump.frames}")
+    print(detector.report())
+    if TILED:
+        print(tiled.report())
+    if ROI:
+        print(roi.report())
+    if SCHEDULED:
+        print(scheduler.report())
+    print(f"Animals counted: {tracker.counts}")
+    detector.close()
     cv2.destroyAllWindows()
     tello.end()
 
 
 def run():
+    # Catat waktu setiap langkah startup sampai frame pertama tampil
+    timer = StartupTimer()
+
+    # Model dimuat di background selama koneksi ke Tello
+    registry.preload(BACKEND, **DETECTOR)
+
     tello = Tello()
     tello.connect()
+    timer.mark("connect")
     print(f"Battery Level: {tello.get_battery()}%")
     tello.streamon()
+    timer.mark("streamon")
 
-    # Muat model deteksi
-    sess, detection_graph, input_tensor, boxes, scores, classes, num_detections = load_model()
+    # Model yang sudah dimuat dan di-warm-up
+    detector = registry.get(BACKEND, **DETECTOR)
+    timer.mark("model")
+    print(registry.report())
 
     # Proses video
-    process(tello, sess, input_tensor, boxes, scores, classes, num_detections)
+    process(tello, detector, timer)
 
 
 if __name__ == "__main__":
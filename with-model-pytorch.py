@@ -2,21 +2,42 @@
 from tkinter import Tk, Label, Button, Frame
 # import openCV for receiving the video frames
 import cv2
-# make imports from the Pillow library for displaying the video stream with Tkinter.
-from PIL import Image, ImageTk
+# import the renderer that reuses one PhotoImage for the video label
+from tk_render import TkRenderer
 # Import the tello module
 from djitellopy import tello
 # Import threading for our takeoff/land method
 import threading
 # import our flight commands
 from flight_commands import start_flying, stop_flying
-from ultralytics import YOLO
+# import the capture -> inference -> render pipeline for the video label
+from video_pipeline import VideoPipeline, draw_boxes
+from color_frame import BGR, TELLO_FRAME_SHAPE
+from frame_mailbox import FrameReadPump
+from startup_timer import StartupTimer
+# import the detector that runs YOLO in its own process
+from detector_process import DetectorProcess
+from detector_backend import create_backend
+from model_cache import ModelCache
+# import the tracker that keeps animal IDs across frames
+from sort_tracker import SortTracker
+# import the gate that skips YOLO on unchanged frames
+from motion_gate import MotionGate
+# import the cheap-first-stage cascade and the shared model registry
+from cascade import CascadeDetector
+from model_registry import registry
+from detections import PostProcessor, COCO_ANIMALS
+from functools import partial
 
 
 import av
 import numpy as np
 
-model = YOLO('best.pt')
+# Mode kaskade (opsional): tahap pertama SSD MobileNet lewat cv2.dnn dengan ambang rendah,
+# best.pt hanya dijalankan pada frame yang diusulkan tahap ini. Hewan yang terlewat oleh SSD
+# umum ikut terlewat, dan kelas "person" (id 1) diusulkan untuk monyet tanpa pernah diuji,
+# jadi mode ini mati secara default sampai diperiksa pada rekaman lapangan.
+CASCADE = False
 
 # Class for controlling the drone via keyboard commands
 class DroneController:
@@ -30,20 +51,47 @@ class DroneController:
         # Create a hidden frame to handle input from key presses and releases
         self.input_frame = Frame(self.root)
 
+        # Time every startup step until the first frame is on screen
+        self.timer = StartupTimer()
+
+        # Model tahap pertama dimuat di background selama koneksi ke Tello. Dibuat di sini, bukan di
+        # level modul, supaya proses DetectorProcess yang mengimpor skrip ini tidak ikut membuatnya.
+        self.proposal = dict(model_path='frozen_inference_graph.pb', config_path='ssd_mobilenet_v1_coco_2017_11_17.pbtxt',
+                             postprocess=PostProcessor(threshold=0.3, classes=COCO_ANIMALS + (1,)), cache=ModelCache())
+        if CASCADE:
+            registry.preload('dnn', **self.proposal)
+
+        # YOLOv8 berjalan di proses terpisah, frame dikirim lewat shared memory. Proses itu sudah
+        # dijalankan sekarang, jadi best.pt dimuat dan di-warm-up selama koneksi ke Tello
+        self.detector = DetectorProcess(partial(create_backend, 'yolo-stream', model_path='best.pt', threshold=0.5,
+                                                cache=ModelCache()))  # Gunakan confidence threshold yang sesuai
+        self.detector.preload(TELLO_FRAME_SHAPE)
+
         # Initialize, connect, and turn on the drones video stream
         self.drone = tello.Tello()
         self.drone.connect()
+        self.timer.mark("connect")
         self.drone.streamon()
+        self.timer.mark("streamon")
         # Initialize a variable to get the video frames from the drone
         self.frame = self.drone.get_frame_read()
 
         # Define a speed for the drone to fly at
         self.drone.speed = 25
 
-        self.animal_model = YOLO('best.pt')
+        self.cascade = CascadeDetector(registry.get('dnn', **self.proposal), self.detector, order=BGR) if CASCADE else None
+        # Saat drone diam dan gambar tidak berubah, hasil deteksi terakhir dipakai ulang
+        self.gate = MotionGate(self.cascade or self.detector, order=BGR)
         
         # Label for displaying video stream
         self.cap_lbl = Label(self.root)
+        self.renderer = TkRenderer(self.cap_lbl)
+
+        # Setiap hewan mendapat ID tetap selama terlihat, untuk penghitungan
+        self.tracker = SortTracker()
+
+        # Video pipeline, started by video_stream()
+        self.pipeline = None
         
         '''
         # Load the TensorFlow model for face recognition
@@ -171,29 +219,11 @@ class DroneController:
 
     def video_stream(self):
         try:
-            # Define the height and width to resize the current frame to
-            h = 480
-            w = 720
-
-            # Read a frame from the drone
-            frame = self.frame.frame
-
-            # Jalankan deteksi menggunakan model YOLOv8
-            results = self.animal_model.predict(frame, conf=0.5)  # Gunakan confidence threshold yang sesuai
-
-            # Visualisasi frame yang telah diberi anotasi
-            annotated_frame = results[0].plot()
-
-            # Konversi frame dari OpenCV ke PIL untuk ditampilkan di Tkinter
-            img = Image.fromarray(annotated_frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-
-            # Set gambar pada label video stream
-            self.cap_lbl.imgtk = imgtk
-            self.cap_lbl.configure(image=imgtk)
-
-            # Jadwalkan frame berikutnya
-            self.cap_lbl.after(10, self.video_stream)
+            # Capture, YOLO inference and drawing each run as their own stage, so a slow
+            # prediction no longer freezes the window or the keyboard controls
+            self.pipeline = VideoPipeline(self.root, FrameReadPump(self.frame, timer=self.timer), self.detect_animals,
+                                          self.draw_frame, self.show_frame, timer=self.timer)
+            self.pipeline.start()
             
             '''
             # Check if the frame is valid
@@ -230,6 +260,27 @@ class DroneController:
         except Exception as e:
             print(f"Error in video_stream: {e}")
 
+    def detect_animals(self, frame):
+        # Jalankan deteksi menggunakan model YOLOv8 (inference stage)
+        # Ultralytics expects BGR arrays and flips them back to RGB itself, so only hand it a reversed view
+        detections = self.gate.detect(frame.view(BGR))
+        detections, ids = self.tracker.update(detections)
+
+        # Simpan hanya kotak dan label "#id nama", gambar dilakukan oleh render stage
+        labels = self.tracker.labels(detections, ids, self.detector.names)
+        return detections.pixels(frame.shape[1], frame.shape[0]), labels
+
+    def draw_frame(self, frame, result):
+        # Gambar hasil deteksi terbaru di atas frame terbaru (render stage)
+        annotated_frame = frame.rgb.copy()
+        if result is not None:
+            draw_boxes(annotated_frame, *result)
+        return annotated_frame
+
+    def show_frame(self, annotated_frame):
+        # Salin piksel ke PhotoImage milik label tanpa membuat image baru
+        self.renderer.show(annotated_frame)
+
     def detect_faces(self, frame):
         try:
             # Prepare the frame for the model
@@ -264,6 +315,16 @@ class DroneController:
         try:
             # Release any resources
             print("Cleaning up resources...")
+            if self.pipeline:
+                self.pipeline.stop()  # Stop the video pipeline workers
+                print(self.pipeline.report())
+                print(f"Render: {self.renderer.report()}")
+            self.detector.stop()  # Stop the detector process
+            print(f"Detector: {self.detector.report()}")
+            print(self.gate.report())
+            if self.cascade:
+                print(self.cascade.report())
+            print(f"Animals counted: {self.tracker.counts}")
             self.drone.end()  # Terminate drone connection
             self.root.quit()  # Quit the Tkinter main loop
             self.root.destroy()  # Destroy the Tkinter root window
@@ -1,11 +1,21 @@
-import cv2
-import av
 from djitellopy import Tello
-from PIL import Image, ImageTk
+from tk_render import TkRenderer
 import tkinter as tk
 import threading
-import tensorflow as tf
-import numpy as np
+from startup_timer import StartupTimer
+from video_decode import decode_frames, MultiResolutionDecoder, open_stream
+from model_registry import registry
+from detections import PostProcessor, COCO_ANIMALS
+from model_cache import ModelCache
+from video_pipeline import draw_boxes
+
+# Model TensorFlow (frozen_inference_graph.pb), hanya kelas hewan, kotak yang saling tumpang tindih dibuang dengan NMS.
+# Graph yang sudah dioptimasi disimpan di cache, peluncuran berikutnya langsung memuatnya
+DETECTOR = dict(model_path="frozen_inference_graph.pb",
+                postprocess=PostProcessor(threshold=0.5, classes=COCO_ANIMALS, nms_iou=0.5), cache=ModelCache())
+
+# Inferensi bertingkat: persiapan, sess.run dan menggambar dari frame berurutan saling tumpang tindih
+PIPELINED = True
 
 
 class TelloApp:
@@ -13,19 +23,36 @@ class TelloApp:
         self.master = master
         self.master.title("DJI Tello Video Feed")
 
+        # Catat waktu setiap langkah startup sampai frame pertama tampil
+        self.timer = StartupTimer()
+
+        # Model dimuat di background selama koneksi ke Tello
+        registry.preload("tf", **DETECTOR)
+
         # Inisialisasi Tello
         self.tello = Tello()
         self.tello.connect()
+        self.timer.mark("connect")
         print(f"Battery Level: {self.tello.get_battery()}%")
         self.tello.streamon()
+        self.timer.mark("streamon")
 
-        # Dekoder video
-        self.container = av.open(self.tello.get_udp_video_address())
+        # Dekoder video (mode: "default", "slice", "frame" atau "low_delay")
+        self.container = open_stream(self.tello.get_udp_video_address(), mode="low_delay", timer=self.timer)
+        # Dekoder langsung menghasilkan frame tampilan dan input model 300x300
+        self.decoder = MultiResolutionDecoder({
+            "display": ("rgb24", None, None),
+            "detector": ("rgb24", 300, 300),
+        })
 
         # Label untuk menampilkan video
         self.video_label = tk.Label(master)
         self.video_label.pack()
 
+        # Renderer yang memakai ulang satu PhotoImage, frame digambar di thread utama Tk
+        self.renderer = TkRenderer(self.video_label, timer=self.timer)
+        self.renderer.start()
+
         # Tombol untuk keluar
         self.quit_button = tk.Button(master, text="Quit", command=self.quit)
         self.quit_button.pack()
@@ -42,83 +69,62 @@ class TelloApp:
         self.video_thread.start()
 
     def load_model(self):
-        # Muat model TensorFlow dan konfigurasi pbtxt
-        self.detection_graph = tf.Graph()
-        with self.detection_graph.as_default():
-            od_graph_def = tf.compat.v1.GraphDef()
-            # Muat frozen_inference_graph.pb
-            with tf.io.gfile.GFile("frozen_inference_graph.pb", "rb") as f:
-                serialized_graph = f.read()
-                od_graph_def.ParseFromString(serialized_graph)
-                tf.import_graph_def(od_graph_def, name="")
-        
-            # Muat konfigurasi pbtxt
-            config_file = "ssd_mobilenet_v1_coco_2017_11_17.pbtxt"
-            with tf.io.gfile.GFile(config_file, "r") as f:
-                pbtxt_str = f.read()
-
-        # Buat sesi untuk inferensi
-        self.sess = tf.compat.v1.Session(graph=self.detection_graph)
-
-        # Tensor input dan output
-        self.input_tensor = self.detection_graph.get_tensor_by_name("image_tensor:0")
-        self.boxes = self.detection_graph.get_tensor_by_name("detection_boxes:0")
-        self.scores = self.detection_graph.get_tensor_by_name("detection_scores:0")
-        self.classes = self.detection_graph.get_tensor_by_name("detection_classes:0")
-        self.num_detections = self.detection_graph.get_tensor_by_name("num_detections:0")
-
-    def update_video(self):
-        for frame in self.container.decode(video=0):
+        # Tunggu model dari registry, sudah dimuat dan di-warm-up sekali per proses
+        self.detector = registry.get("tf", **DETECTOR)
+        self.timer.mark("model")
+        print(registry.report())
+
+    def decoded_frames(self):
+        """(frame tampilan, input model 300x300) untuk setiap frame yang didekode"""
+        for frame in decode_frames(self.container, self.timer):
             if not self.running:
                 break
 
             try:
-                # Konversi frame ke RGB
-                frame_rgb = cv2.cvtColor(frame.to_ndarray(format="bgr24"), cv2.COLOR_BGR2RGB)
-
-                # Terapkan deteksi wajah
-                frame_rgb = self.detect_faces(frame_rgb)
-
-                # Konversi ke format Tkinter
-                img = Image.fromarray(frame_rgb)
-                imgtk = ImageTk.PhotoImage(image=img)
-
-                # Update UI di thread utama
-                self.video_label.imgtk = imgtk
-                self.video_label.configure(image=imgtk)
-
+                # Konversi frame langsung ke RGB oleh dekoder, tanpa cvtColor tambahan. Frame tidak
+                # di-release karena renderer Tk masih memegangnya setelah submit
+                # (writable karena kotak deteksi digambar langsung di frame ini)
+                frames = self.decoder.convert(frame, writable=True)
+                yield frames["display"].rgb, frames["detector"].rgb
             except Exception as e:
                 print(f"Error while decoding video: {e}")
 
-        self.quit()
+    def update_video(self):
+        try:
+            if PIPELINED:
+                # Dekode + resize frame N+1 dan gambar frame N-1 berjalan bersamaan dengan sess.run frame N
+                for frame, detections in self.detector.pipeline(self.decoded_frames()):
+                    self.renderer.submit(self.draw_detections(frame, detections))
+            else:
+                for frame, resized_frame in self.decoded_frames():
+                    self.renderer.submit(self.detect_faces(frame, resized_frame))
+        except Exception as e:
+            print(f"Error in update_video: {e}")
 
-    def detect_faces(self, frame):
-        # Resize frame untuk model
-        resized_frame = cv2.resize(frame, (300, 300))
-        input_frame = np.expand_dims(resized_frame, axis=0)
+        self.quit()
 
-        # Inferensi menggunakan model
-        (boxes, scores, classes, num_detections) = self.sess.run(
-            [self.boxes, self.scores, self.classes, self.num_detections],
-            feed_dict={self.input_tensor: input_frame}
-        )
+    def detect_faces(self, frame, resized_frame=None):
+        # Inferensi menggunakan model, backend me-resize sendiri jika input 300x300 belum ada
+        detections = self.detector.detect(frame if resized_frame is None else resized_frame)
+        return self.draw_detections(frame, detections)
 
-        # Filter berdasarkan skor deteksi
+    def draw_detections(self, frame, detections):
+        # Kotak sudah difilter berdasarkan skor, gambar dalam koordinat frame tampilan
         h, w, _ = frame.shape
-        for i in range(int(num_detections[0])):
-            if scores[0][i] > 0.5:  # Ambang batas deteksi
-                box = boxes[0][i]
-                (ymin, xmin, ymax, xmax) = (box[0] * h, box[1] * w, box[2] * h, box[3] * w)
-                cv2.rectangle(frame, (int(xmin), int(ymin)), (int(xmax), int(ymax)), (0, 255, 0), 2)
+        draw_boxes(frame, detections.pixels(w, h))
 
+        # Serahkan ke renderer, frame lama dilewati jika Tk tertinggal
         return frame
 
     def quit(self):
         self.running = False
+        self.renderer.stop()
+        print(f"Render: {self.renderer.report()}")
         self.tello.streamoff()
         self.tello.end()
         self.container.close()
-        self.sess.close()
+        print(self.detector.report())
+        self.detector.close()
         self.master.destroy()
 
 